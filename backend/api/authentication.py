@@ -0,0 +1,126 @@
+# backend/api/authentication.py
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions, serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import user_cache
+from .models import CustomUser
+
+# Profile claims carried by every access token, enough for role checks and /users/me
+USER_CLAIMS = ('username', 'email', 'first_name', 'last_name', 'role', 'is_staff', 'is_active')
+
+
+def set_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    # Same format as the user serializer's output
+    token['date_joined'] = serializers.DateTimeField().to_representation(user.date_joined)
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues token pairs carrying the user's role and profile claims (copied to every access token)."""
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshes the profile claims from the database, so role or profile changes apply on the next refresh."""
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]}).first()
+        if user is not None:
+            set_user_claims(access, user)
+            data['access'] = str(access)
+        return data
+
+
+class RoleTokenUser(TokenUser):
+    """User built from the access token claims alone; never touches the database."""
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that only loads the CustomUser row when it is needed.
+
+    Safe (read-only) requests carrying role claims get a RoleTokenUser. Writes, tokens
+    issued without role claims and view actions listed in the view's `full_user_actions`
+    get the full user, read through the short-TTL user cache and checked for
+    deactivation and password changes like JWTAuthentication does.
+    """
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.needs_full_user(request, validated_token):
+            return self.get_user(validated_token), validated_token
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return RoleTokenUser(validated_token), validated_token
+
+    def needs_full_user(self, request, validated_token):
+        if request.method not in permissions.SAFE_METHODS or 'role' not in validated_token:
+            return True
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        return getattr(view, 'action', None) in getattr(view, 'full_user_actions', ())
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async Django views (plain HttpRequest), always with the full
+        user. Returns None without credentials; raises the same exceptions.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await user_cache.aget(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token), validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def get_user(self, validated_token):
+        user = user_cache.get(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token)
+
+    def check_user(self, user, validated_token):
+        """The checks JWTAuthentication.get_user makes on the loaded user."""
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
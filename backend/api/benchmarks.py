@@ -0,0 +1,387 @@
+# backend/api/benchmarks.py
+"""
+Before/after benchmarks for the optimized paths, run on demand against the test database:
+
+    python manage.py test api.benchmarks
+
+Not collected by the default test run (only test*.py modules are). Each case times the
+current implementation against the one it replaced, prints both and checks that the
+current one is not slower; CheckInConcurrencyBenchmark compares the WSGI and ASGI
+check-in paths side by side instead.
+"""
+import asyncio
+import io
+import json
+import queue
+import statistics
+import threading
+import time
+import uuid
+from unittest import mock
+
+import qrcode
+from datetime import date, timedelta
+from decimal import Decimal
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+from django.db import connection
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import RoleTokenObtainPairSerializer
+from .certificate_template import CERTIFICATE_TEMPLATE
+from .models import Attendance, CustomUser
+from .qr_tokens import issue_checkin_token
+from .renderers import FastJSONParser, FastJSONRenderer
+from .serializers import AttendanceSerializer
+from .tests import APITestData
+from .utils import draw_qr_code, qr_code_matrix
+
+VALIDATION_URL = "http://localhost:3000/validate-certificate?code=0b9c2f1e-8d5a-4f7e-9c3b-2a6d1e4f8b7c"
+
+
+def per_call(function, number, repeat=5):
+    """Best per-call time in seconds over `repeat` runs of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def compare(before, after, number, repeat=7):
+    """Best per-call times of two functions, run interleaved so machine noise hits both alike."""
+    best_before = best_after = float("inf")
+    for _ in range(repeat):
+        best_before = min(best_before, per_call(before, number, repeat=1))
+        best_after = min(best_after, per_call(after, number, repeat=1))
+    return best_before, best_after
+
+
+class Benchmark(SimpleTestCase):
+    def report(self, label, before, after, unit="ms", scale=1000):
+        print(f"\n{label}: {before * scale:.3f} {unit} -> {after * scale:.3f} {unit} ({before / after:.1f}x)")
+
+
+def draw_qr_code_as_image(p, data, x, y, size):
+    """QR drawing before user-004: PNG rendered with Pillow, decoded again and embedded as an image."""
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    buffer.seek(0)
+    p.drawImage(ImageReader(buffer), x, y, width=size, height=size, mask="auto")
+
+
+class QRCodeBenchmark(Benchmark):
+    def render(self, draw):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer)
+        draw(p, VALIDATION_URL, 6*inch, 1.5*inch, 1*inch)
+        p.showPage()
+        p.save()
+        return buffer.getvalue()
+
+    def test_vector_modules_vs_png_image(self):
+        before = per_call(lambda: self.render(draw_qr_code_as_image), number=50)
+        # First certificate of a code (matrix not memoized yet) and re-renders of the same code
+        cold = per_call(lambda: (qr_code_matrix.cache_clear(), self.render(draw_qr_code)), number=50)
+        warm = per_call(lambda: self.render(draw_qr_code), number=50)
+        self.report("QR code page, PNG image -> vector modules (new code)", before, cold)
+        self.report("QR code page, PNG image -> vector modules (memoized)", before, warm)
+        print(f"PDF size: {len(self.render(draw_qr_code_as_image))} -> {len(self.render(draw_qr_code))} bytes")
+        self.assertLess(cold, before)
+
+
+def draw_certificate_inline(p, participant_name, total_hours, issue_date, unique_code, draw_qr, event_rows):
+    """Certificate drawing before user-005: every static string and line drawn for each document."""
+    width, height = letter
+    style = ParagraphStyle("Inline", parent=getSampleStyleSheet()["Normal"], fontSize=10)
+    p.setFont("Helvetica-Bold", 24)
+    p.drawCentredString(width / 2.0, height - 1.5*inch, "CERTIFICADO DE PARTICIPAÇÃO")
+    p.setFont("Helvetica", 12)
+    text_y = height - 3*inch
+    p.drawString(inch, text_y, "Certificamos que")
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(inch + 1.2*inch, text_y, participant_name)
+    p.setFont("Helvetica", 12)
+    p.drawString(inch, text_y - 0.5*inch, "participou de eventos e atividades organizados por [Nome da Organização]")
+    p.drawString(inch, text_y - 0.8*inch, "totalizando uma carga horária de")
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(inch + 3.5*inch, text_y - 0.8*inch, f"{total_hours} horas.")
+    p.setFont("Helvetica", 10)
+    p.drawString(inch, 2*inch, f"Emitido em: {issue_date.strftime('%d/%m/%Y')}")
+    p.drawString(inch, 1.8*inch, f"Código de Validação: {unique_code}")
+    draw_qr(p, width - 2*inch, 1.5*inch, 1*inch)
+    p.showPage()
+
+    def details_header(title):
+        p.setFont("Helvetica-Bold", 16)
+        p.drawCentredString(width / 2.0, height - 1.5*inch, title)
+        p.setFont("Helvetica-Bold", 11)
+        p.drawString(inch, height - 2.5*inch, "Evento")
+        p.drawString(width - 2*inch, height - 2.5*inch, "Horas")
+        p.line(inch, height - 2.6*inch, width - inch, height - 2.6*inch)
+        p.setFont("Helvetica", 10)
+
+    details_header("DETALHAMENTO DE PARTICIPAÇÃO")
+    y_position = height - 2.9*inch
+    for event_name, hours in event_rows:
+        if y_position < 1.5*inch:
+            p.showPage()
+            details_header("DETALHAMENTO DE PARTICIPAÇÃO (cont.)")
+            y_position = height - 2.9*inch
+        paragraph = Paragraph(event_name, style)
+        paragraph.wrapOn(p, width - 3.5*inch, 0.3*inch)
+        paragraph.drawOn(p, inch, y_position - paragraph.height + 0.1*inch)
+        p.drawString(width - 2*inch, y_position, f"{hours:.2f}")
+        y_position -= max(0.3*inch, paragraph.height + 0.1*inch)
+
+
+class CertificateTemplateBenchmark(Benchmark):
+    def render(self, draw, events):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer, pagesize=letter)
+        draw(
+            p,
+            participant_name="Maria da Silva",
+            total_hours=Decimal("12.50"),
+            issue_date=date(2025, 5, 20),
+            unique_code="0b9c2f1e-8d5a-4f7e-9c3b-2a6d1e4f8b7c",
+            draw_qr=lambda p, x, y, size: draw_qr_code(p, VALIDATION_URL, x, y, size),
+            event_rows=[(f"Oficina {index}", Decimal("2.50")) for index in range(events)],
+        )
+        p.save()
+        return buffer.getvalue()
+
+    def test_forms_vs_inline_drawing(self):
+        template = CERTIFICATE_TEMPLATE
+        # One details page, and several continuation pages sharing one form
+        for events in (5, 100):
+            before, after = compare(
+                lambda: self.render(draw_certificate_inline, events),
+                lambda: self.render(template.render, events),
+                number=50
+            )
+            self.report(f"Certificate with {events} events, inline drawing -> form XObjects", before, after)
+            print(
+                f"PDF size: {len(self.render(draw_certificate_inline, events))} -> "
+                f"{len(self.render(template.render, events))} bytes"
+            )
+
+
+class SparseFieldsBenchmark(APITestData, Benchmark, TestCase):
+    """A full ?fields= export of ROWS attendances, paged through with the next links."""
+    ROWS = 10_000
+    fields = 'id,participant,participant_username,event,event_name,check_in_time,check_out_time,calculated_hours'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', role='admin')
+        events = [cls.create_event(f'Evento {index}') for index in range(5)]
+        participants = CustomUser.objects.bulk_create([
+            CustomUser(username=f'participante{index}', email=f'participante{index}@example.com', role='participant')
+            for index in range(cls.ROWS // len(events))
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(
+                participant=participant, event=event, calculated_hours=Decimal('4.00'),
+                check_in_time=event.start_date, check_out_time=event.start_date + timedelta(hours=4)
+            )
+            for participant in participants for event in events
+        ], batch_size=1000)
+
+    def test_values_rows_vs_serializer(self):
+        client = self.client_for(self.admin)
+
+        def export():
+            rows, url = [], f'/api/attendances/?fields={self.fields}&page_size=100'
+            while url:
+                page = client.get(url).json()
+                rows.extend(page['results'])
+                url = page['next']
+            return rows
+
+        def serializer_export():
+            # What ?fields= did before user-021's fast path: model instances through the serializer
+            with mock.patch.object(AttendanceSerializer, 'values_plan', return_value=None):
+                return export()
+
+        rows = export()
+        self.assertEqual(len(rows), self.ROWS)
+        self.assertEqual(rows, serializer_export())
+        before, after = compare(serializer_export, export, number=1, repeat=3)
+        print(
+            f"\nExport {self.ROWS} rows of GET /api/attendances/ with ?fields= (pages of 100): "
+            f"serializer {self.ROWS / before:.0f} rows/s -> values() rows {self.ROWS / after:.0f} rows/s "
+            f"({before / after:.1f}x)"
+        )
+        self.assertLess(after, before)
+
+
+class JSONBenchmark(Benchmark):
+    """100-row list pages as the endpoints return them: flat attendances, and certificates with nested event details."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.pages = {
+            'attendance': {
+                'next': 'http://localhost:8000/api/attendances/?cursor=eyJwIjpbXX0%3D',
+                'previous': None,
+                'results': [
+                    {
+                        'id': index, 'participant': index, 'participant_username': f'participante{index}',
+                        'event': 3, 'event_name': 'Semana Acadêmica', 'check_in_time': now,
+                        'check_out_time': now + timedelta(hours=4), 'calculated_hours': Decimal('4.00'),
+                        'method': 'qrcode', 'notes': 'Check-in via QR.', 'code': uuid.uuid4(),
+                    }
+                    for index in range(100)
+                ],
+            },
+            'certificate': {
+                'next': 'http://localhost:8000/api/certificates/?cursor=eyJwIjpbXX0%3D',
+                'previous': None,
+                'results': [
+                    {
+                        'id': index, 'participant': index, 'participant_username': f'participante{index}',
+                        'unique_code': uuid.uuid4(), 'issue_date': now.date(),
+                        'total_hours_at_generation': Decimal('20.00'),
+                        'pdf_file': f'http://localhost:8000/media/certificates/certificado_{index}.pdf',
+                        'attended_events_details': [
+                            {'event_name': f'Oficina {event} da Semana Acadêmica', 'hours': Decimal('2.50')}
+                            for event in range(8)
+                        ],
+                    }
+                    for index in range(100)
+                ],
+            },
+        }
+
+    def test_orjson_renderer_vs_drf(self):
+        for name, page in self.pages.items():
+            self.assertEqual(FastJSONRenderer().render(page), JSONRenderer().render(page))
+            before, after = compare(
+                lambda: JSONRenderer().render(page), lambda: FastJSONRenderer().render(page), number=200
+            )
+            self.report(f"Render a 100-row {name} page, DRF -> orjson", before, after, unit="us", scale=1e6)
+            self.assertLess(after, before)
+
+    def test_orjson_parser_vs_drf(self):
+        for name, page in self.pages.items():
+            body = JSONRenderer().render(page)
+            before, after = compare(
+                lambda: JSONParser().parse(io.BytesIO(body)), lambda: FastJSONParser().parse(io.BytesIO(body)),
+                number=200
+            )
+            self.report(f"Parse a 100-row {name} page, DRF -> orjson", before, after, unit="us", scale=1e6)
+            self.assertLess(after, before)
+
+
+class CheckInConcurrencyBenchmark(APITestData, Benchmark, TransactionTestCase):
+    """
+    REQUESTS check-ins by distinct participants, CONCURRENCY at a time: through the DRF action
+    with one thread per request in flight (a threaded WSGI server), and through the async view
+    on one event loop (ASGI). Reports throughput and latency percentiles for each path.
+
+    Needs a database that takes concurrent writers: PostgreSQL, or SQLite with a file test
+    database (TEST NAME). The async path only gains where requests wait on the database, so
+    numbers on SQLite, in process, understate it.
+    """
+    REQUESTS = 200
+    CONCURRENCY = 20
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot write concurrently to an in-memory SQLite database')
+        self.event = self.create_event('Evento')
+        now = timezone.now()
+        self.body = json.dumps({
+            'event_id': self.event.pk,
+            'qr_code_data': issue_checkin_token(self.event.pk, now - timedelta(minutes=1), self.event.end_date),
+        })
+
+    def authorizations(self, prefix):
+        return [
+            f'Bearer {RoleTokenObtainPairSerializer.get_token(self.create_user(f"{prefix}{index}")).access_token}'
+            for index in range(self.REQUESTS)
+        ]
+
+    def report_run(self, label, elapsed, latencies):
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"\n{label}: {len(latencies) / elapsed:.0f} req/s, latency p50 {percentiles[49] * 1000:.1f} ms, "
+            f"p95 {percentiles[94] * 1000:.1f} ms, p99 {percentiles[98] * 1000:.1f} ms"
+        )
+
+    def wsgi_run(self, authorizations):
+        pending = queue.Queue()
+        for authorization in authorizations:
+            pending.put(authorization)
+        latencies, statuses = [], []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    try:
+                        authorization = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    start = time.perf_counter()
+                    response = client.post(
+                        '/api/attendances/check_in/', self.body,
+                        content_type='application/json', headers={'Authorization': authorization}
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.CONCURRENCY)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, statuses
+
+    async def asgi_run(self, authorizations):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(self.CONCURRENCY)
+        latencies, statuses = [], []
+
+        async def check_in(authorization):
+            async with slots:
+                start = time.perf_counter()
+                response = await client.post(
+                    '/api/async/attendances/check-in/', self.body,
+                    content_type='application/json', headers={'Authorization': authorization}
+                )
+                latencies.append(time.perf_counter() - start)
+                statuses.append(response.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(check_in(authorization) for authorization in authorizations))
+        return time.perf_counter() - start, latencies, statuses
+
+    def test_wsgi_vs_asgi_check_in(self):
+        wsgi, asgi = self.authorizations('wsgi'), self.authorizations('asgi')
+
+        elapsed, latencies, statuses = self.wsgi_run(wsgi)
+        self.assertEqual(statuses, [201] * self.REQUESTS)
+        self.report_run(f"WSGI check-in, {self.CONCURRENCY} threads", elapsed, latencies)
+
+        elapsed, latencies, statuses = asyncio.run(self.asgi_run(asgi))
+        self.assertEqual(statuses, [201] * self.REQUESTS)
+        self.report_run(f"ASGI check-in, {self.CONCURRENCY} in flight", elapsed, latencies)
+
+        self.assertEqual(Attendance.objects.filter(event=self.event).count(), 2 * self.REQUESTS)
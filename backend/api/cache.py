@@ -0,0 +1,146 @@
+# backend/api/cache.py
+import copy
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CustomUser, Event
+
+
+class LRUCache:
+    """Thread-safe, bounded in-process mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+ActiveEvent = namedtuple('ActiveEvent', ['id', 'start_date', 'end_date', 'total_workload'])
+
+
+class ActiveEventCache:
+    """
+    Per-process snapshot of the events running now (or starting within `ttl` seconds).
+    Loaded with a single query, reloaded once older than `ttl` and invalidated by the
+    Event save/delete signals; the TTL covers changes made by other processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._events = {}
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _rows(self):
+        now = timezone.now()
+        return Event.objects.filter(
+            start_date__lte=now + timedelta(seconds=self.ttl),
+            end_date__gte=now
+        ).values_list('id', 'start_date', 'end_date', 'total_workload')
+
+    def _snapshot(self):
+        if time.monotonic() < self._expires_at:
+            return self._events
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._events = {row[0]: ActiveEvent(*row) for row in self._rows()}
+                self._expires_at = time.monotonic() + self.ttl
+            return self._events
+
+    def get(self, event_id):
+        """The ActiveEvent with this id, or None if it is not running or about to start."""
+        return self._snapshot().get(event_id)
+
+    async def aget(self, event_id):
+        """get() for async views; reloads with the async ORM (without the lock, a concurrent reload is harmless)."""
+        if time.monotonic() >= self._expires_at:
+            self._events = {row[0]: ActiveEvent(*row) async for row in self._rows()}
+            self._expires_at = time.monotonic() + self.ttl
+        return self._events.get(event_id)
+
+    def invalidate(self):
+        self._expires_at = 0
+
+
+class UserCache:
+    """
+    Full CustomUser rows for authenticated writes, kept for `ttl` seconds per process.
+    The CustomUser save/delete signals drop entries, so a deactivation or role change
+    applies at once in this process and within `ttl` seconds in the others.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize)
+
+    def _fresh(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() >= entry[1]:
+            return None
+        return entry[0]
+
+    def _store(self, user_id, user):
+        if user is not None:
+            self._entries.set(user_id, (user, time.monotonic() + self.ttl))
+        return user
+
+    def get(self, user_id):
+        """A private copy of the user, or None if it does not exist."""
+        user = self._fresh(user_id) or self._store(user_id, CustomUser.objects.filter(pk=user_id).first())
+        # Views may modify request.user, so the cached instance is never handed out
+        return copy.copy(user) if user is not None else None
+
+    async def aget(self, user_id):
+        """get() for async views."""
+        user = self._fresh(user_id) or self._store(user_id, await CustomUser.objects.filter(pk=user_id).afirst())
+        return copy.copy(user) if user is not None else None
+
+    def pop(self, user_id):
+        self._entries.pop(user_id)
+
+
+# Public validation payloads and ETags keyed by certificate unique_code
+certificate_validation_cache = LRUCache(settings.CERTIFICATE_VALIDATION_CACHE_SIZE)
+
+# Events currently open for check-in
+active_events = ActiveEventCache(settings.ACTIVE_EVENT_CACHE_TTL)
+
+# Users loaded by api.authentication.RoleJWTAuthentication
+user_cache = UserCache(settings.AUTH_USER_CACHE_TTL, settings.AUTH_USER_CACHE_SIZE)
@@ -0,0 +1,112 @@
+# backend/api/certificate_template.py
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph
+from xml.sax.saxutils import escape
+
+
+class CertificateTemplate:
+    """
+    Certificate layout built once per process.
+
+    The static parts of each page kind (titles, fixed sentences, table headers and
+    ruling lines) are kept as drawing instructions. PDF form XObjects belong to a
+    single document, so a render replays them into a form the first time a page kind
+    is needed and reuses that form on every later page of the same kind; page kinds a
+    certificate does not use (the continuation page) are never written to its PDF.
+    Per-certificate fields are drawn on top. See CertificateTemplateBenchmark in
+    api/benchmarks.py. Instances are read-only after construction and safe to share
+    between threads.
+    """
+    FRONT_FORM = "certificate_front"
+    DETAILS_FORM = "certificate_details"
+    DETAILS_CONTINUED_FORM = "certificate_details_continued"
+
+    def __init__(self, pagesize=letter):
+        self.pagesize = pagesize
+        self.width, self.height = pagesize
+        # Dedicated copy so the shared sample stylesheet is never mutated
+        self.event_name_style = ParagraphStyle(
+            "CertificateEventName", parent=getSampleStyleSheet()["Normal"], fontSize=10
+        )
+
+        self.name_y = self.height - 3*inch
+        self.hours_y = self.name_y - 0.8*inch
+        self.table_header_y = self.height - 2.5*inch
+        self.first_row_y = self.table_header_y - 0.4*inch
+        self.row_height = 0.3*inch
+        self.bottom_margin = 1.5*inch
+        self.event_name_width = self.width - 3.5*inch
+        self.hours_x = self.width - 2*inch
+
+        self._forms = {
+            self.FRONT_FORM: tuple(self._front_instructions()),
+            self.DETAILS_FORM: tuple(self._details_instructions("DETALHAMENTO DE PARTICIPAÇÃO")),
+            self.DETAILS_CONTINUED_FORM: tuple(self._details_instructions("DETALHAMENTO DE PARTICIPAÇÃO (cont.)")),
+        }
+
+    def draw_static(self, p, form):
+        """Draws the static layout of a page kind on the current page, defining its form on first use."""
+        if not p.hasForm(form):
+            p.beginForm(form)
+            for method, args in self._forms[form]:
+                getattr(p, method)(*args)
+            p.endForm()
+        p.doForm(form)
+
+    def _front_instructions(self):
+        yield "setFont", ("Helvetica-Bold", 24)
+        yield "drawCentredString", (self.width / 2.0, self.height - 1.5*inch, "CERTIFICADO DE PARTICIPAÇÃO")
+        yield "setFont", ("Helvetica", 12)
+        yield "drawString", (inch, self.name_y, "Certificamos que")
+        yield "drawString", (inch, self.name_y - 0.5*inch, "participou de eventos e atividades organizados por [Nome da Organização]")
+        yield "drawString", (inch, self.hours_y, "totalizando uma carga horária de")
+
+    def _details_instructions(self, title):
+        yield "setFont", ("Helvetica-Bold", 16)
+        yield "drawCentredString", (self.width / 2.0, self.height - 1.5*inch, title)
+        yield "setFont", ("Helvetica-Bold", 11)
+        yield "drawString", (inch, self.table_header_y, "Evento")
+        yield "drawString", (self.hours_x, self.table_header_y, "Horas")
+        yield "line", (inch, self.table_header_y - 0.1*inch, self.width - inch, self.table_header_y - 0.1*inch)
+
+    def render(self, p, participant_name, total_hours, issue_date, unique_code, draw_qr, event_rows):
+        """
+        Draws a full certificate on the canvas. `draw_qr(p, x, y, size)` draws
+        the validation QR code and `event_rows` yields (event name, hours) pairs.
+        """
+        # --- Page 1: Main Certificate ---
+        self.draw_static(p, self.FRONT_FORM)
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(inch + 1.2*inch, self.name_y, participant_name)
+        p.setFont("Helvetica-Bold", 14)
+        p.drawString(inch + 3.5*inch, self.hours_y, f"{total_hours} horas.")
+        p.setFont("Helvetica", 10)
+        p.drawString(inch, 2*inch, f"Emitido em: {issue_date.strftime('%d/%m/%Y')}")
+        p.drawString(inch, 1.8*inch, f"Código de Validação: {unique_code}")
+        draw_qr(p, self.width - 2*inch, 1.5*inch, 1*inch)
+        p.showPage()
+
+        # --- Page 2: Detailed List ---
+        self.draw_static(p, self.DETAILS_FORM)
+        p.setFont("Helvetica", 10)
+        y_position = self.first_row_y
+        for event_name, hours in event_rows:
+            if y_position < self.bottom_margin:
+                p.showPage()
+                self.draw_static(p, self.DETAILS_CONTINUED_FORM)
+                p.setFont("Helvetica", 10)
+                y_position = self.first_row_y
+
+            # Paragraph wraps long event names
+            event_name_paragraph = Paragraph(escape(event_name), self.event_name_style)
+            event_name_paragraph.wrapOn(p, self.event_name_width, self.row_height)
+            event_name_paragraph.drawOn(p, inch, y_position - event_name_paragraph.height + 0.1*inch)
+
+            p.drawString(self.hours_x, y_position, f"{hours:.2f}")
+            y_position -= max(self.row_height, event_name_paragraph.height + 0.1*inch)
+
+
+# Shared by every render in this process
+CERTIFICATE_TEMPLATE = CertificateTemplate()
@@ -0,0 +1,411 @@
+# backend/api/importers.py
+import codecs
+import csv
+import io
+import logging
+import os
+from itertools import islice
+
+import chardet
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import close_old_connections, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .ledger import apply_attendance_changes
+from .rollups import apply_checkin_changes
+from .models import Attendance, CustomUser, Event, ImportJob, Participant, calculate_hours, MAX_CALCULATED_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos das consultas IN, dos bulk_create e dos commits da importação de arquivos
+IMPORT_CHUNK_SIZE = 1000
+# Quantidade máxima de falhas guardadas no relatório de uma ImportJob
+MAX_REPORTED_ERRORS = 100
+# Cabeçalhos aceitos nas planilhas além dos nomes dos campos (name, email, cpf)
+HEADER_ALIASES = {
+    'nome': 'name',
+    'e-mail': 'email',
+    'evento': 'event_id',
+    'entrada': 'check_in_time',
+    'saida': 'check_out_time',
+    'saída': 'check_out_time',
+    'observacoes': 'notes',
+    'observações': 'notes',
+}
+
+
+def chunked(items, size=IMPORT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_chunks(iterable, size=IMPORT_CHUNK_SIZE):
+    """Como chunked(), mas para iteradores: nunca mantém mais de um bloco em memória."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _normalize_header(header):
+    names = [str(name).strip().lower() if name is not None else '' for name in header]
+    return [HEADER_ALIASES.get(name, name) for name in names]
+
+
+def _detect_encoding(sample):
+    # UTF-8 é verificado antes do chardet, que erra com amostras curtas e poucos acentos
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+    except UnicodeDecodeError:
+        return chardet.detect(sample)['encoding'] or 'utf-8'
+    return 'utf-8-sig'
+
+
+def iter_csv_rows(fileobj):
+    """Lê um CSV (separado por vírgula, ponto e vírgula ou tab) linha a linha como dicionários."""
+    sample = fileobj.read(64 * 1024)
+    fileobj.seek(0)
+    encoding = _detect_encoding(sample)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    header_line = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    header = _normalize_header(next(csv.reader([header_line], dialect)))
+    for row in csv.reader(text, dialect):
+        if any(cell.strip() for cell in row):
+            yield dict(zip(header, row))
+
+
+def iter_xlsx_rows(fileobj):
+    """Lê a primeira planilha de um XLSX em modo read-only (streaming) como dicionários."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError: # Dependência opcional
+        raise ValueError('Importação de XLSX requer o pacote openpyxl.')
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        for row in rows:
+            if any(cell not in (None, '') for cell in row):
+                yield {key: ('' if value is None else str(value)) for key, value in zip(header, row)}
+    finally:
+        workbook.close()
+
+
+def iter_spreadsheet_rows(fileobj, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        return iter_xlsx_rows(fileobj)
+    if extension == '.csv':
+        return iter_csv_rows(fileobj)
+    raise ValueError('Formato de arquivo não suportado. Envie um arquivo .csv ou .xlsx.')
+
+
+def validate_participant_data(data_item):
+    """
+    Valida os dados de um único participante.
+    Retorna um dicionário de dados limpos ou levanta DjangoValidationError.
+    """
+    cleaned_data = {}
+    errors = {}
+
+    # Nome
+    name = data_item.get('name')
+    if not name or not str(name).strip():
+        errors['name'] = 'Nome não pode ser vazio.'
+    else:
+        cleaned_data['name'] = str(name).strip()
+
+    # Email
+    email = data_item.get('email')
+    if not email:
+        errors['email'] = 'Email não pode ser vazio.'
+    else:
+        try:
+            validate_email(email)
+            cleaned_data['email'] = email
+        except DjangoValidationError:
+            errors['email'] = 'Formato de email inválido.'
+    
+    # CPF (opcional)
+    cpf = data_item.get('cpf')
+    if cpf:
+        cleaned_cpf = ''.join(filter(str.isdigit, str(cpf)))
+        # Adicione validação mais robusta de CPF se necessário
+        # if len(cleaned_cpf) != 11:
+        #     errors['cpf'] = 'CPF deve ter 11 dígitos.'
+        cleaned_data['cpf'] = cleaned_cpf or None
+    else:
+        cleaned_data['cpf'] = None
+        
+    # Adicione validação para outros campos aqui (ex: phone, organization)
+    # cleaned_data['phone'] = data_item.get('phone')
+    # cleaned_data['organization'] = data_item.get('organization')
+
+
+    if errors:
+        raise DjangoValidationError(errors)
+    
+    return cleaned_data
+
+
+def import_participants(items):
+    """
+    Importa uma lista de participantes com um número de consultas independente do tamanho da lista:
+    valida tudo em memória, detecta duplicatas dentro do próprio lote, busca emails/CPFs já
+    cadastrados com consultas IN em blocos e insere os novos com bulk_create em blocos.
+    Retorna (success_entries, failed_entries) no formato da importação em lote, na ordem da entrada.
+    Deve ser chamada dentro de uma transação.
+    """
+    failed = [] # (posição na entrada, entrada)
+    candidates = [] # (posição, dados fornecidos, dados limpos)
+    batch_emails = set()
+    batch_cpfs = set()
+
+    for index, item_data in enumerate(items):
+        if not isinstance(item_data, dict):
+            failed.append((index, {
+                "data_provided": item_data,
+                "status": "error",
+                "reason": "Dados inválidos.",
+                "details": "Cada participante deve ser um objeto."
+            }))
+            continue
+        try:
+            cleaned_data = validate_participant_data(item_data)
+        except DjangoValidationError as e:
+            failed.append((index, {
+                "data_provided": item_data,
+                "status": "error",
+                "reason": "Dados inválidos.",
+                "details": e.message_dict if hasattr(e, 'message_dict') else e.messages
+            }))
+            continue
+
+        if cleaned_data['email'] in batch_emails or (cleaned_data['cpf'] and cleaned_data['cpf'] in batch_cpfs):
+            failed.append((index, {
+                "data_provided": item_data,
+                "status": "skipped",
+                "reason": "Participante repetido no lote (email ou CPF duplicado)."
+            }))
+            continue
+        batch_emails.add(cleaned_data['email'])
+        if cleaned_data['cpf']:
+            batch_cpfs.add(cleaned_data['cpf'])
+        candidates.append((index, item_data, cleaned_data))
+
+    existing_emails = set()
+    for emails in chunked(sorted(batch_emails)):
+        existing_emails.update(Participant.objects.filter(email__in=emails).values_list('email', flat=True))
+    existing_cpfs = set()
+    for cpfs in chunked(sorted(batch_cpfs)):
+        existing_cpfs.update(Participant.objects.filter(cpf__in=cpfs).values_list('cpf', flat=True))
+
+    to_create = []
+    for index, item_data, cleaned_data in candidates:
+        if cleaned_data['email'] in existing_emails:
+            reason = "Participante já existe (email duplicado)."
+        elif cleaned_data['cpf'] and cleaned_data['cpf'] in existing_cpfs:
+            reason = "Participante já existe (CPF duplicado)."
+        else:
+            to_create.append((cleaned_data, Participant(
+                name=cleaned_data['name'],
+                email=cleaned_data['email'],
+                cpf=cleaned_data['cpf']
+                # Mapeie outros campos do cleaned_data para o seu modelo Participant
+            )))
+            continue
+        failed.append((index, {"data_provided": item_data, "status": "skipped", "reason": reason}))
+
+    for chunk in chunked(to_create):
+        Participant.objects.bulk_create([participant for _, participant in chunk])
+
+    success_entries = [
+        {
+            "email": cleaned_data['email'],
+            "name": cleaned_data['name'],
+            "id": participant.id, # ID do participante criado
+            "status": "success"
+        }
+        for cleaned_data, participant in to_create
+    ]
+    failed_entries = [entry for _, entry in sorted(failed, key=lambda pair: pair[0])]
+    return success_entries, failed_entries
+
+
+def run_participant_import(job_id):
+    """
+    Processa o arquivo de uma ImportJob em streaming, confirmando cada bloco de IMPORT_CHUNK_SIZE
+    linhas em sua própria transação e atualizando os contadores de progresso após cada bloco.
+    A memória usada depende do tamanho do bloco, não do tamanho do arquivo.
+    O arquivo enviado é apagado ao final, com ou sem sucesso.
+    """
+    close_old_connections()
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status', 'updated_at'])
+    try:
+        with job.file.open('rb') as fileobj:
+            for chunk in iter_chunks(iter_spreadsheet_rows(fileobj, job.file.name)):
+                with transaction.atomic():
+                    success_entries, failed_entries = import_participants(chunk)
+                job.rows_read += len(chunk)
+                job.inserted += len(success_entries)
+                for entry in failed_entries:
+                    if entry['status'] == 'skipped':
+                        job.skipped += 1
+                    else:
+                        job.failed += 1
+                job.errors.extend(failed_entries[:MAX_REPORTED_ERRORS - len(job.errors)])
+                job.save(update_fields=['rows_read', 'inserted', 'skipped', 'failed', 'errors', 'updated_at'])
+        job.status = 'done'
+    except Exception as e:
+        logger.exception("Participant import %s failed", job_id)
+        job.status = 'failed'
+        job.message = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'message', 'finished_at', 'updated_at'])
+        job.delete_file()
+        close_old_connections()
+
+
+def _parse_import_datetime(value):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = parse_datetime(str(value).strip()) if value not in (None, '') else None
+        except ValueError: # Formato válido, mas data inexistente
+            return None
+        if parsed is None:
+            return None
+    if timezone.is_naive(parsed):
+        # Horários das planilhas de presença estão no fuso local (TIME_ZONE)
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_import_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def import_attendances(items):
+    """
+    Importa presenças já encerradas (method='import') identificadas por email ou CPF do participante e event_id.
+    Participantes e eventos são resolvidos com consultas IN em blocos; o CPF é resolvido pelo cadastro de
+    Participant (cpf -> email) e o email pelo usuário. As horas são calculadas para o lote inteiro antes
+    da inserção, que é feita com bulk_create em blocos, e o ledger de horas é atualizado no mesmo lote.
+    Linhas com check-out anterior ao check-in ou duração acima de MAX_CALCULATED_HOURS são rejeitadas e
+    sessões já importadas são ignoradas.
+    Retorna (success_entries, failed_entries) na ordem da entrada. Deve ser chamada dentro de uma transação.
+    """
+    failed = [] # (posição na entrada, entrada)
+    rows = [] # (posição, dados fornecidos, email, cpf, event_id, check_in, check_out, notas)
+
+    def reject(index, item_data, reason, status="error"):
+        failed.append((index, {"data_provided": item_data, "status": status, "reason": reason}))
+
+    for index, item_data in enumerate(items):
+        if not isinstance(item_data, dict):
+            reject(index, item_data, "Cada presença deve ser um objeto.")
+            continue
+        email = str(item_data.get('email') or '').strip().lower()
+        cpf = ''.join(filter(str.isdigit, str(item_data.get('cpf') or '')))
+        event_id = _parse_import_int(item_data.get('event_id'))
+        check_in_time = _parse_import_datetime(item_data.get('check_in_time'))
+        check_out_time = _parse_import_datetime(item_data.get('check_out_time'))
+        if not email and not cpf:
+            reject(index, item_data, "Informe o email ou o CPF do participante.")
+        elif event_id is None:
+            reject(index, item_data, "ID do evento inválido.")
+        elif check_in_time is None or check_out_time is None:
+            reject(index, item_data, "Horários de check-in e check-out são obrigatórios (formato ISO 8601).")
+        elif check_out_time < check_in_time:
+            reject(index, item_data, "Check-out anterior ao check-in.")
+        elif calculate_hours(check_in_time, check_out_time) > MAX_CALCULATED_HOURS:
+            reject(index, item_data, "Duração da sessão excede o limite de horas.")
+        else:
+            rows.append([index, item_data, email, cpf, event_id, check_in_time, check_out_time,
+                         str(item_data.get('notes') or '').strip()])
+
+    # CPF -> email pelo cadastro de participantes
+    cpf_emails = {}
+    for cpfs in chunked(sorted({row[3] for row in rows if row[3] and not row[2]})):
+        cpf_emails.update(
+            (cpf, email.lower()) for cpf, email in Participant.objects.filter(cpf__in=cpfs).values_list('cpf', 'email')
+        )
+    for row in rows:
+        if not row[2]:
+            row[2] = cpf_emails.get(row[3], '')
+
+    user_ids = {}
+    for emails in chunked(sorted({row[2] for row in rows if row[2]})):
+        user_ids.update(
+            CustomUser.objects.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=emails
+            ).values_list('email_lower', 'pk')
+        )
+    event_ids = set()
+    for ids in chunked(sorted({row[4] for row in rows})):
+        event_ids.update(Event.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    # Sessões já existentes (reimportação da mesma planilha)
+    existing = set()
+    for chunk in chunked([row for row in rows if row[2] in user_ids and row[4] in event_ids]):
+        existing.update(Attendance.objects.filter(
+            participant_id__in={user_ids[row[2]] for row in chunk},
+            event_id__in={row[4] for row in chunk},
+            check_in_time__in={row[5] for row in chunk}
+        ).values_list('participant_id', 'event_id', 'check_in_time'))
+
+    to_create = []
+    for index, item_data, email, cpf, event_id, check_in_time, check_out_time, notes in rows:
+        participant_id = user_ids.get(email)
+        if participant_id is None:
+            reject(index, item_data, "Participante não encontrado.")
+        elif event_id not in event_ids:
+            reject(index, item_data, "Evento não encontrado.")
+        elif (participant_id, event_id, check_in_time) in existing:
+            reject(index, item_data, "Sessão já importada (mesmo participante, evento e check-in).", status="skipped")
+        else:
+            existing.add((participant_id, event_id, check_in_time))
+            to_create.append(Attendance(
+                participant_id=participant_id,
+                event_id=event_id,
+                check_in_time=check_in_time,
+                check_out_time=check_out_time,
+                # bulk_create não chama Attendance.save(), então as horas são calculadas aqui
+                calculated_hours=calculate_hours(check_in_time, check_out_time),
+                method='import',
+                notes=notes or "Importado de planilha."
+            ))
+
+    for chunk in chunked(to_create):
+        Attendance.objects.bulk_create(chunk)
+    # bulk_create também não dispara os signals do ledger
+    apply_attendance_changes(added=[attendance.ledger_state() for attendance in to_create])
+    apply_checkin_changes(added=[attendance.checkin_state() for attendance in to_create])
+
+    success_entries = [
+        {
+            "id": attendance.pk,
+            "participant_id": attendance.participant_id,
+            "event_id": attendance.event_id,
+            "calculated_hours": attendance.calculated_hours,
+            "status": "success"
+        }
+        for attendance in to_create
+    ]
+    failed_entries = [entry for _, entry in sorted(failed, key=lambda pair: pair[0])]
+    return success_entries, failed_entries
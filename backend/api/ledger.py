@@ -0,0 +1,129 @@
+# backend/api/ledger.py
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Attendance, HoursLedger
+from .rollups import additive_upsert, apply_event_stats_changes
+
+# Rows per bulk insert when rebuilding
+LEDGER_CHUNK_SIZE = 1000
+
+
+def ledger_deltas(removed=(), added=()):
+    """
+    Groups attendance ledger states (see Attendance.ledger_state) into
+    {(participant_id, event_id): (hours, sessions)} deltas. None states are ignored.
+    """
+    deltas = defaultdict(lambda: [Decimal('0.00'), 0])
+    for sign, states in ((-1, removed), (1, added)):
+        for state in states:
+            if state is None:
+                continue
+            participant_id, event_id, hours = state
+            delta = deltas[(participant_id, event_id)]
+            delta[0] += sign * hours
+            delta[1] += sign
+    return {key: (hours, sessions) for key, (hours, sessions) in deltas.items() if hours or sessions}
+
+
+def apply_attendance_changes(removed=(), added=()):
+    """
+    Moves the hours of removed/added attendance states in the ledger and in the
+    per-event dashboard totals. Each chunk is a single additive upsert, so concurrent
+    writers never lose updates.
+    """
+    deltas = ledger_deltas(removed, added)
+    if not deltas:
+        return
+    with transaction.atomic():
+        rows = additive_upsert(
+            HoursLedger,
+            ('participant_id', 'event_id'),
+            ('hours', 'sessions'),
+            [(participant_id, event_id, hours, sessions) for (participant_id, event_id), (hours, sessions) in deltas.items()],
+            returning=('participant_id', 'event_id', 'sessions')
+        )
+        event_deltas = defaultdict(lambda: {'participants': 0, 'sessions': 0, 'hours': Decimal('0.00')})
+        for (_, event_id), (hours, sessions) in deltas.items():
+            event_deltas[event_id]['sessions'] += sessions
+            event_deltas[event_id]['hours'] += hours
+        # A participant counts for the event while the ledger entry has closed sessions
+        for participant_id, event_id, new_sessions in rows:
+            old_sessions = new_sessions - deltas[(participant_id, event_id)][1]
+            event_deltas[event_id]['participants'] += (new_sessions > 0) - (old_sessions > 0)
+        apply_event_stats_changes(event_deltas)
+
+
+def participant_event_hours(participant_id):
+    """Ledger hours of the participant per event, ordered by event name."""
+    return HoursLedger.objects.filter(
+        participant_id=participant_id,
+        sessions__gt=0
+    ).values('event_id', 'event__name', 'hours').order_by('event__name')
+
+
+def events_breakdown(rows):
+    """Certificate.events_breakdown snapshot from rows with event_id, event__name and hours."""
+    return [
+        {
+            'event_id': row['event_id'],
+            'event_name': row['event__name'],
+            'hours': str(Decimal(row['hours']).quantize(Decimal('0.01'))),
+        }
+        for row in rows
+    ]
+
+
+def events_breakdown_key(breakdown):
+    """What a certificate covers: its (event_id, hours) pairs, independent of order and event names."""
+    return tuple(sorted((item['event_id'], item['hours']) for item in breakdown))
+
+
+def expected_ledger():
+    """Ledger contents computed from the raw Attendance rows."""
+    rows = Attendance.objects.filter(
+        check_in_time__isnull=False,
+        check_out_time__isnull=False
+    ).values('participant_id', 'event_id').annotate(
+        hours=Sum('calculated_hours'),
+        sessions=Count('id')
+    ).order_by()
+    return {(row['participant_id'], row['event_id']): (row['hours'], row['sessions']) for row in rows}
+
+
+def find_ledger_mismatches():
+    """Returns [(key, expected, current)] for every ledger entry that differs from the raw data."""
+    expected = expected_ledger()
+    current = {
+        (participant_id, event_id): (hours, sessions)
+        for participant_id, event_id, hours, sessions in HoursLedger.objects.exclude(
+            hours=0, sessions=0
+        ).values_list('participant_id', 'event_id', 'hours', 'sessions')
+    }
+    return [
+        (key, expected.get(key), current.get(key))
+        for key in sorted(expected.keys() | current.keys())
+        if expected.get(key) != current.get(key)
+    ]
+
+
+def rebuild_ledger():
+    """Rewrites the ledger entries that differ from the raw data. Returns the mismatches found."""
+    with transaction.atomic():
+        mismatches = find_ledger_mismatches()
+        if mismatches:
+            ledger_pks = {
+                (participant_id, event_id): pk
+                for pk, participant_id, event_id in HoursLedger.objects.values_list('pk', 'participant_id', 'event_id')
+            }
+            HoursLedger.objects.filter(
+                pk__in=[ledger_pks[key] for key, _, _ in mismatches if key in ledger_pks]
+            ).delete()
+            HoursLedger.objects.bulk_create([
+                HoursLedger(participant_id=participant_id, event_id=event_id, hours=expected[0], sessions=expected[1])
+                for (participant_id, event_id), expected, _ in mismatches
+                if expected is not None
+            ], batch_size=LEDGER_CHUNK_SIZE)
+    return mismatches
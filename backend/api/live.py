@@ -0,0 +1,193 @@
+# backend/api/live.py
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Messages for one event, delivered from any thread into the subscriber's event loop."""
+
+    def __init__(self, broker, event_id, maxsize):
+        self.broker = broker
+        self.event_id = event_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.queue.full():
+            # Slow consumer: the oldest message goes, the next counts resync covers it
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """The next message, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Per-event pub/sub inside one process. publish() may be called from any thread
+    (sync views); subscribers are async streams. Only reaches the subscribers of
+    this worker; see PostgresNotifyBroker for several workers.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id):
+        subscription = Subscription(self, event_id, self.queue_size)
+        with self._lock:
+            self._subscriptions[event_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.event_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.event_id]
+
+    def publish(self, event_id, message):
+        self.deliver(event_id, message)
+
+    def deliver(self, event_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(message)
+            except RuntimeError: # Event loop already closed
+                self.unsubscribe(subscription)
+
+
+class PostgresNotifyBroker(InProcessBroker):
+    """
+    Fans messages out to every worker through PostgreSQL LISTEN/NOTIFY on the default
+    database (psycopg2). publish() sends a NOTIFY; a daemon thread per process listens
+    on its own connection and delivers to the local subscribers.
+    """
+    channel = 'api_live'
+
+    def __init__(self, queue_size=100):
+        super().__init__(queue_size)
+        self._listener = None
+
+    def subscribe(self, event_id):
+        self._ensure_listener()
+        return super().subscribe(event_id)
+
+    def publish(self, event_id, message):
+        payload = json.dumps({'event_id': event_id, 'message': message}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='live-notify-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            wrapper = connections.create_connection('default')
+            try:
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                while True:
+                    if select.select([raw], [], [], 5) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        data = json.loads(raw.notifies.pop(0).payload)
+                        self.deliver(data['event_id'], data['message'])
+            except Exception:
+                logger.exception("Live notification listener failed, reconnecting")
+                time.sleep(1)
+            finally:
+                wrapper.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured in settings.LIVE_BROKER_BACKEND."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.LIVE_BROKER_BACKEND)(queue_size=settings.LIVE_QUEUE_SIZE)
+    return _broker
+
+
+def publish_attendance_change(event_id, kind, participant_id, at=None):
+    """Publishes a 'check_in' or 'check_out' once the current transaction commits."""
+    message = {
+        'type': kind,
+        'event_id': event_id,
+        'participant_id': participant_id,
+        'at': timezone.localtime(at or timezone.now()).isoformat(),
+    }
+    transaction.on_commit(lambda: get_broker().publish(event_id, message))
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def event_counts_stream(event_id, load_counts):
+    """
+    Server-sent events for one event: a `counts` snapshot on connect, then one `counts`
+    message per check-in/check-out, keepalive comments while idle and a fresh snapshot
+    from `load_counts()` every LIVE_RESYNC_INTERVAL seconds (covers imports and edits).
+    """
+    subscription = get_broker().subscribe(event_id)
+    try:
+        counts = await load_counts()
+        yield sse_message('counts', counts)
+        resync_at = time.monotonic() + settings.LIVE_RESYNC_INTERVAL
+        while True:
+            message = await subscription.get(min(settings.LIVE_KEEPALIVE, max(resync_at - time.monotonic(), 0)))
+            if message is not None:
+                counts = dict(counts, **{
+                    'open': counts['open'] + (1 if message['type'] == 'check_in' else -1),
+                    'check_ins': counts['check_ins'] + (message['type'] == 'check_in'),
+                    'check_outs': counts['check_outs'] + (message['type'] == 'check_out'),
+                })
+                yield sse_message('counts', dict(counts, last=message))
+            elif time.monotonic() >= resync_at:
+                counts = await load_counts()
+                resync_at = time.monotonic() + settings.LIVE_RESYNC_INTERVAL
+                yield sse_message('counts', counts)
+            else:
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
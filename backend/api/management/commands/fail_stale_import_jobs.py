@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Marks as failed the participant imports left pending/running by a restarted worker "
+        "(no progress for IMPORT_JOB_STALE_AFTER seconds) and deletes their uploaded files."
+    )
+
+    def handle(self, *args, **options):
+        marked = ImportJob.objects.fail_stale()
+        self.stdout.write(self.style.SUCCESS(f"{marked} stale import jobs marked as failed."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.ledger import find_ledger_mismatches, rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Verifies the hours ledger against the raw Attendance rows and rewrites the entries that differ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report mismatches, without changing the ledger.")
+
+    def handle(self, *args, **options):
+        mismatches = find_ledger_mismatches() if options['check'] else rebuild_ledger()
+        for (participant_id, event_id), expected, current in mismatches:
+            self.stdout.write(
+                f"participant={participant_id} event={event_id} expected={expected} ledger={current}"
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Ledger is consistent with the attendance records."))
+        elif options['check']:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} ledger entries differ from the attendance records."))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} ledger entries rebuilt."))
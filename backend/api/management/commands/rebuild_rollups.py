@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import find_rollup_mismatches, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Verifies the dashboard rollups against the raw Attendance and Certificate rows and rebuilds them if they differ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report mismatches, without changing the rollups.")
+
+    def handle(self, *args, **options):
+        mismatches = find_rollup_mismatches() if options['check'] else rebuild_rollups()
+        for name, key, expected, current in mismatches:
+            self.stdout.write(f"{name} {key}: expected={expected} rollup={current}")
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Rollups are consistent with the raw records."))
+        elif options['check']:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} rollup rows differ from the raw records."))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rollups rebuilt ({len(mismatches)} rows differed)."))
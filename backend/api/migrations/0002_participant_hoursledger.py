@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:18
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_hours_ledger(apps, schema_editor):
+    Attendance = apps.get_model('api', 'Attendance')
+    HoursLedger = apps.get_model('api', 'HoursLedger')
+    rows = Attendance.objects.filter(
+        check_in_time__isnull=False,
+        check_out_time__isnull=False
+    ).values('participant_id', 'event_id').annotate(
+        hours=Sum('calculated_hours'),
+        sessions=Count('id')
+    ).order_by()
+    HoursLedger.objects.bulk_create([
+        HoursLedger(participant_id=row['participant_id'], event_id=row['event_id'], hours=row['hours'], sessions=row['sessions'])
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Participant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('email', models.EmailField(max_length=254, unique=True, validators=[django.core.validators.EmailValidator()])),
+                ('cpf', models.CharField(blank=True, max_length=14, null=True, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HoursLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=9)),
+                ('sessions', models.IntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours_ledger', to='api.event')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('participant', 'event'), name='unique_hours_ledger_entry')],
+            },
+        ),
+        migrations.RunPython(populate_hours_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:20
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def snapshot_existing_certificates(apps, schema_editor):
+    # Existing certificates showed the participant's live hours, freeze what they show today
+    Certificate = apps.get_model('api', 'Certificate')
+    HoursLedger = apps.get_model('api', 'HoursLedger')
+    breakdowns = {}
+    for row in HoursLedger.objects.filter(sessions__gt=0).values(
+        'participant_id', 'event_id', 'event__name', 'hours'
+    ).order_by('participant_id', 'event__name').iterator():
+        breakdowns.setdefault(row['participant_id'], []).append({
+            'event_id': row['event_id'],
+            'event_name': row['event__name'],
+            'hours': str(Decimal(row['hours']).quantize(Decimal('0.01'))),
+        })
+    certificates = list(Certificate.objects.only('id', 'participant_id'))
+    for certificate in certificates:
+        certificate.events_breakdown = breakdowns.get(certificate.participant_id, [])
+    Certificate.objects.bulk_update(certificates, ['events_breakdown'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_participant_hoursledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='events_breakdown',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(snapshot_existing_certificates, migrations.RunPython.noop),
+    ]
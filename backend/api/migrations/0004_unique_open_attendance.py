@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:21
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_open_attendances(apps, schema_editor):
+    # Double check-ins left several open attendances for the same participant and event;
+    # keep the first one, as the check-in endpoint always reported it as the current one.
+    Attendance = apps.get_model('api', 'Attendance')
+    duplicates = Attendance.objects.filter(check_out_time__isnull=True).values(
+        'participant_id', 'event_id'
+    ).annotate(count=Count('id'), first_id=Min('id')).filter(count__gt=1).order_by()
+    for row in duplicates:
+        Attendance.objects.filter(
+            participant_id=row['participant_id'],
+            event_id=row['event_id'],
+            check_out_time__isnull=True
+        ).exclude(pk=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_certificate_events_breakdown'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_open_attendances, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('check_out_time__isnull', True)), fields=('participant', 'event'), name='unique_open_attendance'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_importjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('check_out_time__isnull', False)), fields=['participant', 'event'], name='attendance_closed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['event', 'participant', 'check_in_time'], name='attendance_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['participant', '-issue_date'], name='certificate_participant_idx'),
+        ),
+    ]
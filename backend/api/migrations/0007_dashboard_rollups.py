@@ -0,0 +1,87 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def populate_rollups(apps, schema_editor):
+    Attendance = apps.get_model('api', 'Attendance')
+    Certificate = apps.get_model('api', 'Certificate')
+    EventStats = apps.get_model('api', 'EventStats')
+    CheckInHourlyStats = apps.get_model('api', 'CheckInHourlyStats')
+    CertificateDailyStats = apps.get_model('api', 'CertificateDailyStats')
+    closed = Q(check_in_time__isnull=False, check_out_time__isnull=False)
+    EventStats.objects.bulk_create([
+        EventStats(
+            event_id=row['event_id'],
+            participants=row['participants'],
+            check_ins=row['check_ins'],
+            sessions=row['sessions'],
+            hours=row['hours'] or Decimal('0.00')
+        )
+        for row in Attendance.objects.values('event_id').annotate(
+            participants=Count('participant_id', filter=closed, distinct=True),
+            check_ins=Count('id', filter=Q(check_in_time__isnull=False)),
+            sessions=Count('id', filter=closed),
+            hours=Sum('calculated_hours', filter=closed)
+        ).order_by().iterator()
+    ], batch_size=1000)
+    CheckInHourlyStats.objects.bulk_create([
+        CheckInHourlyStats(event_id=row['event_id'], hour=row['hour'], check_ins=row['check_ins'])
+        for row in Attendance.objects.filter(check_in_time__isnull=False).annotate(
+            hour=TruncHour('check_in_time', tzinfo=timezone.get_current_timezone())
+        ).values('event_id', 'hour').annotate(check_ins=Count('id')).order_by().iterator()
+    ], batch_size=1000)
+    CertificateDailyStats.objects.bulk_create([
+        CertificateDailyStats(day=row['issue_date'], issued=row['issued'])
+        for row in Certificate.objects.values('issue_date').annotate(issued=Count('id')).order_by().iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_attendance_certificate_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('issued', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.event')),
+                ('participants', models.IntegerField(default=0)),
+                ('check_ins', models.IntegerField(default=0)),
+                ('sessions', models.IntegerField(default=0)),
+                ('hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CheckInHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('check_ins', models.IntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='api.event')),
+            ],
+            options={
+                'ordering': ['event', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('event', 'hour'), name='unique_checkin_hourly_stats')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
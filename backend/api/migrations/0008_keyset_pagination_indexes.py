@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_dashboard_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-check_in_time', '-id'], name='attendance_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['-issue_date', '-id'], name='certificate_keyset_idx'),
+        ),
+    ]
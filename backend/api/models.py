@@ -1,9 +1,12 @@
 # backend/api/models.py
 import uuid
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connections, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 
@@ -33,6 +36,50 @@ class Event(models.Model):
     def __str__(self):
         return self.name
 
+# Largest value Attendance.calculated_hours holds (max_digits=5, decimal_places=2)
+MAX_CALCULATED_HOURS = Decimal('999.99')
+
+def calculate_hours(check_in_time, check_out_time):
+    """Duration between check-in and check-out in hours, rounded to 2 decimal places."""
+    if not (check_in_time and check_out_time):
+        return Decimal('0.00')
+    seconds = Decimal(str((check_out_time - check_in_time).total_seconds()))
+    return (seconds / 3600).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+class AttendanceManager(models.Manager):
+    def open_check_in(self, participant_id, event_id, check_in_time, method, notes):
+        """
+        Creates an open attendance in a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+        Returns the new id, or None when the event does not exist or the participant
+        already has an open attendance for it (unique_open_attendance constraint).
+        """
+        connection = connections[self.db]
+        opts = self.model._meta
+
+        def prep(field_name, value):
+            return opts.get_field(field_name).get_db_prep_value(value, connection, prepared=False)
+
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(opts.db_table)} "
+                f"({qn('participant_id')}, {qn('event_id')}, {qn('check_in_time')}, {qn('check_out_time')}, "
+                f"{qn('calculated_hours')}, {qn('method')}, {qn('notes')}) "
+                f"SELECT %s, {qn('id')}, %s, NULL, %s, %s, %s FROM {qn(Event._meta.db_table)} WHERE {qn('id')} = %s "
+                f"ON CONFLICT ({qn('participant_id')}, {qn('event_id')}) WHERE {qn('check_out_time')} IS NULL DO NOTHING "
+                f"RETURNING {qn('id')}",
+                [
+                    participant_id,
+                    prep('check_in_time', check_in_time),
+                    prep('calculated_hours', Decimal('0.00')),
+                    method,
+                    notes,
+                    event_id,
+                ]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
 class Attendance(models.Model):
     METHOD_CHOICES = (
         ('manual', 'Manual'),
@@ -48,22 +95,124 @@ class Attendance(models.Model):
     method = models.CharField(max_length=10, choices=METHOD_CHOICES, default='manual')
     notes = models.TextField(blank=True, help_text="Observações sobre esta frequência específica.")
 
-    def save(self, *args, **kwargs):
+    objects = AttendanceManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Last persisted state, used to move this row's hours in the ledger on save/delete
+        instance._ledger_state = instance.ledger_state()
+        instance._checkin_state = instance.checkin_state()
+        return instance
+
+    def ledger_state(self):
+        """(participant_id, event_id, hours) counted in the hours ledger, or None while the attendance is open."""
         if self.check_in_time and self.check_out_time:
-            duration = self.check_out_time - self.check_in_time
-            self.calculated_hours = Decimal(duration.total_seconds() / 3600)
-        else:
-            self.calculated_hours = Decimal('0.00')
-        super().save(*args, **kwargs)
+            return (self.participant_id, self.event_id, self.calculated_hours)
+        return None
+
+    def checkin_state(self):
+        """(event_id, check_in_time) counted in the check-in rollups, or None without a check-in."""
+        if self.check_in_time:
+            return (self.event_id, self.check_in_time)
+        return None
+
+    def save(self, *args, **kwargs):
+        self.calculated_hours = calculate_hours(self.check_in_time, self.check_out_time)
+        # The ledger is updated by the post_save signal inside the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.participant.username} - {self.event.name} ({self.check_in_time} - {self.check_out_time})"
 
     class Meta:
-        # Ensure a participant cannot have overlapping attendance for the same event?
-        # This might be complex to enforce purely at DB level if multiple check-ins are allowed.
-        # Business logic validation might be better.
         ordering = ['event', 'participant', 'check_in_time']
+        constraints = [
+            # At most one open (not checked-out) attendance per participant and event.
+            # Check-in relies on it to insert without a prior lookup (see AttendanceManager.open_check_in).
+            models.UniqueConstraint(
+                fields=['participant', 'event'],
+                condition=models.Q(check_out_time__isnull=True),
+                name='unique_open_attendance'
+            ),
+        ]
+        # The open attendance lookup in check-in is served by unique_open_attendance
+        indexes = [
+            # Closed sessions per participant (hours aggregates, ledger rebuild)
+            models.Index(
+                fields=['participant', 'event'],
+                condition=models.Q(check_out_time__isnull=False),
+                name='attendance_closed_idx'
+            ),
+            # Matches Meta.ordering
+            models.Index(fields=['event', 'participant', 'check_in_time'], name='attendance_ordering_idx'),
+            # Keyset pagination key (see api/pagination.py)
+            models.Index(fields=['-check_in_time', '-id'], name='attendance_keyset_idx'),
+        ]
+
+
+class HoursLedger(models.Model):
+    """
+    Closed attendance hours summed per (participant, event).
+    Maintained incrementally from Attendance writes (see api/ledger.py) and
+    verified/rebuilt with the `rebuild_hours_ledger` management command.
+    """
+    participant = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='hours_ledger')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='hours_ledger')
+    hours = models.DecimalField(max_digits=9, decimal_places=2, default=Decimal('0.00'))
+    sessions = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.participant_id} - {self.event_id}: {self.hours}h ({self.sessions} sessões)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['participant', 'event'], name='unique_hours_ledger_entry'),
+        ]
+
+
+class EventStats(models.Model):
+    """
+    Per-event dashboard totals, maintained incrementally alongside the hours ledger
+    (see api/rollups.py) and reconciled with the `rebuild_rollups` management command.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    participants = models.IntegerField(default=0) # Participants with at least one closed session
+    check_ins = models.IntegerField(default=0)
+    sessions = models.IntegerField(default=0) # Closed sessions
+    hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    def __str__(self):
+        return f"{self.event_id}: {self.participants} participantes, {self.hours}h"
+
+
+class CheckInHourlyStats(models.Model):
+    """Check-ins per event and hour, bucketed in the project TIME_ZONE."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='hourly_stats')
+    hour = models.DateTimeField() # Start of the local hour
+    check_ins = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.event_id} - {self.hour}: {self.check_ins}"
+
+    class Meta:
+        ordering = ['event', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'hour'], name='unique_checkin_hourly_stats'),
+        ]
+
+
+class CertificateDailyStats(models.Model):
+    """Certificates issued per day."""
+    day = models.DateField(unique=True)
+    issued = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.issued}"
+
+    class Meta:
+        ordering = ['day']
 
 
 class Certificate(models.Model):
@@ -74,15 +223,108 @@ class Certificate(models.Model):
     total_hours_at_generation = models.DecimalField(max_digits=7, decimal_places=2)
     # Optionally store the generated PDF
     pdf_file = models.FileField(upload_to='certificates/', null=True, blank=True)
-    # We might need a way to link this certificate to the specific Attendance records it covers,
-    # perhaps a ManyToManyField to Attendance, or store the generation parameters (e.g., date range).
-    # For now, generation logic will query Attendance based on participant and potentially a date range.
+    # Per-event hours captured at issuance, never recomputed afterwards:
+    # [{"event_id": 1, "event_name": "...", "hours": "1.50"}, ...] ordered by event name
+    events_breakdown = models.JSONField(default=list, blank=True, editable=False)
+
+    def attended_events(self):
+        """Event breakdown snapshot with the hours as Decimal."""
+        return [
+            {'event_name': item['event_name'], 'hours': Decimal(item['hours'])}
+            for item in self.events_breakdown
+        ]
+
+    def covers_event(self, event_id):
+        return any(item.get('event_id') == event_id for item in self.events_breakdown)
 
     def __str__(self):
         return f"Certificado para {self.participant.username} - {self.issue_date} ({self.unique_code})"
 
     class Meta:
         ordering = ['-issue_date', 'participant']
+        indexes = [
+            # Participant certificate listings, newest first
+            models.Index(fields=['participant', '-issue_date'], name='certificate_participant_idx'),
+            # Keyset pagination key (see api/pagination.py)
+            models.Index(fields=['-issue_date', '-id'], name='certificate_keyset_idx'),
+        ]
+
+
+def import_upload_storage():
+    """Storage of the uploaded import files, outside MEDIA_ROOT so they are never served."""
+    return FileSystemStorage(location=settings.IMPORT_UPLOAD_ROOT)
+
+
+STALE_IMPORT_MESSAGE = 'Importação interrompida antes de terminar. Envie o arquivo novamente.'
+
+
+def stale_import_cutoff(now=None):
+    """Pending/running jobs without progress since this moment lost their background thread."""
+    return (now or timezone.now()) - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+
+
+class ImportJobManager(models.Manager):
+    def fail_stale(self):
+        """
+        Marks as failed the pending/running jobs without progress for IMPORT_JOB_STALE_AFTER
+        seconds (their background thread died with its worker) and deletes their files.
+        Returns the number of jobs marked. Run by the fail_stale_import_jobs command.
+        """
+        now = timezone.now()
+        stale = self.filter(status__in=('pending', 'running'), updated_at__lt=stale_import_cutoff(now))
+        marked = 0
+        for job in stale:
+            # Conditional update, so a job that made progress meanwhile is left alone
+            if self.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+                status='failed', message=STALE_IMPORT_MESSAGE, finished_at=now, updated_at=now
+            ):
+                job.delete_file()
+                marked += 1
+        return marked
+
+
+class ImportJob(models.Model):
+    """
+    Participant file import processed in the background; its counters are polled for progress.
+    The uploaded file is deleted once the import ends.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pendente'),
+        ('running', 'Em andamento'),
+        ('done', 'Concluída'),
+        ('failed', 'Falhou'),
+    )
+    file = models.FileField(upload_to='imports/', storage=import_upload_storage, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_read = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # First failed/skipped rows only, so long imports keep a bounded report
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every progress save; see ImportJobManager.fail_stale()
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ImportJobManager()
+
+    def __str__(self):
+        return f"Importação {self.pk} ({self.status})"
+
+    def is_stale(self, now=None):
+        """True for a pending/running job that stopped making progress (see ImportJobManager.fail_stale)."""
+        return self.status in ('pending', 'running') and self.updated_at < stale_import_cutoff(now)
+
+    def delete_file(self):
+        if self.file:
+            self.file.delete(save=False)
+            ImportJob.objects.filter(pk=self.pk).update(file='')
+
+    class Meta:
+        ordering = ['-created_at']
 
 
 class Participant(models.Model):
@@ -0,0 +1,163 @@
+# backend/api/pagination.py
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _cursor_value(value):
+    # Full precision: DjangoJSONEncoder would truncate datetimes to milliseconds
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite key, e.g. ('-check_in_time', '-id').
+
+    Each page is a range query that starts right after (or before) the last row of
+    the previous page, so deep pages cost the same as the first one. The last key
+    field must be unique. NULLs sort as larger than every value, like PostgreSQL's
+    default, so plain b-tree indexes on the key serve both directions. The total count is only computed when the
+    client asks for it with ?count=true.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.count_requested(request) else None
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, reverse))
+        rows = list(queryset.order_by(*self.order_by(reverse))[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forward there is a previous page whenever we started from a cursor, and vice versa
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('true', '1', 'yes')
+
+    def order_by(self, reverse):
+        # Explicit NULLS placement so every database sorts NULL as the largest value
+        return [
+            F(name).desc(nulls_first=True) if descending != reverse else F(name).asc(nulls_last=True)
+            for name, descending in self.fields
+        ]
+
+    def position_filter(self, position, reverse):
+        """Rows strictly after `position` in the ordering (before it when `reverse`)."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.fields, position):
+            descending_scan = descending != reverse
+            if value is None:
+                # NULL is the largest value: below it come all the others, above it nothing
+                beyond = Q(**{f'{name}__isnull': False}) if descending_scan else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                if descending_scan:
+                    beyond = Q(**{f'{name}__lt': value})
+                else:
+                    beyond = Q(**{f'{name}__gt': value}) | Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii'), validate=True).decode('utf-8'))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+            return position, bool(payload.get('r'))
+        except (BinasciiError, UnicodeError, ValueError, KeyError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        # Model instances, or dicts on the values() fast path
+        values = [row[name] if isinstance(row, dict) else getattr(row, name) for name, _ in self.fields]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, default=_cursor_value, separators=(',', ':'))
+        return replace_query_param(self.base_url, self.cursor_query_param, b64encode(payload.encode('utf-8')).decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': f'Only with ?{self.count_query_param}=true.'},
+                'results': schema,
+            },
+        }
+
+
+class AttendancePagination(KeysetPagination):
+    ordering = ('-check_in_time', '-id')
+
+
+class CertificatePagination(KeysetPagination):
+    ordering = ('-issue_date', '-id')
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('id',)
@@ -0,0 +1,47 @@
+# backend/api/qr_tokens.py
+import time
+from django.conf import settings
+from django.core import signing
+
+SALT = 'api.checkin-qr'
+# Tolerated clock difference between the issuing and the verifying worker, in seconds
+CLOCK_SKEW = 30
+
+
+class CheckinTokenError(Exception):
+    """Raised when a check-in QR token is malformed, forged or outside its validity window."""
+
+
+def issue_checkin_token(event_id, valid_from, valid_until):
+    """Signs a check-in token for the event, valid between the two datetimes."""
+    payload = {
+        'e': event_id,
+        'nbf': int(valid_from.timestamp()),
+        'exp': int(valid_until.timestamp()),
+    }
+    return signing.dumps(payload, key=settings.CHECKIN_QR_KEYS[0], salt=SALT, compress=True)
+
+
+def verify_checkin_token(token):
+    """
+    Returns the event id carried by a check-in token, verified in-process only.
+    Any of the CHECKIN_QR_KEYS is accepted, so keys can be rotated without invalidating
+    tokens issued with the previous one.
+    """
+    try:
+        payload = signing.loads(
+            token,
+            key=settings.CHECKIN_QR_KEYS[0],
+            fallback_keys=settings.CHECKIN_QR_KEYS[1:],
+            salt=SALT
+        )
+        event_id, not_before, expires = int(payload['e']), payload['nbf'], payload['exp']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise CheckinTokenError('QR Code inválido.')
+
+    now = time.time()
+    if now < not_before - CLOCK_SKEW:
+        raise CheckinTokenError('QR Code ainda não é válido.')
+    if now > expires + CLOCK_SKEW:
+        raise CheckinTokenError('QR Code expirado.')
+    return event_id
@@ -0,0 +1,68 @@
+# backend/api/renderers.py
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError: # Optional accelerator, DRF's stdlib encoder is used without it
+    orjson = None
+
+# Datetimes go through DRF's encoder (millisecond precision, "Z" suffix); int dict keys become strings like json does
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Strings, integers, UUIDs and the types handled by DRF's JSONEncoder.default (datetimes,
+    dates, times, Decimals) come out byte-for-byte as with DRF's renderer, and U+2028/U+2029
+    are escaped the same way. Data orjson cannot encode (integers beyond 64 bits, types
+    neither encoder knows) goes to DRF's renderer, which renders or raises as usual.
+
+    Floats are the exception: some are written in another form (1e16, 1e-7 and 0.00001 where
+    DRF writes 1e+16, 1e-07 and 1e-05), and NaN/Infinity become null where DRF raises ValueError. The API's own fields carry no
+    floats (Decimals are rendered as strings). Indented output, ASCII-only output and
+    non-compact separators are left to DRF's renderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer: these are valid JSON but break inline JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser backed by orjson when it is installed. Bodies orjson rejects are parsed again by
+    DRF's parser, so what is accepted (NaN/Infinity never are, as with STRICT_JSON) and the
+    parse error messages stay the same. Integers beyond 64 bits are read as floats.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read() if stream is not None else b''
+        try:
+            return orjson.loads(body if codecs.lookup(encoding).name == 'utf-8' else body.decode(encoding))
+        except (ValueError, UnicodeDecodeError): # orjson.JSONDecodeError is a ValueError
+            return super().parse(io.BytesIO(body), media_type, parser_context)
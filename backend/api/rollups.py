@@ -0,0 +1,174 @@
+# backend/api/rollups.py
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Attendance, Certificate, CertificateDailyStats, CheckInHourlyStats, EventStats
+
+# Rows per upsert statement
+ROLLUP_CHUNK_SIZE = 1000
+
+EVENT_STATS_FIELDS = ('participants', 'check_ins', 'sessions', 'hours')
+
+
+def additive_upsert(model, key_fields, value_fields, rows, returning=()):
+    """
+    Adds the values of each (*keys, *values) row to the matching row of `model`, inserting it
+    when missing. Each chunk is a single INSERT ... ON CONFLICT DO UPDATE, so concurrent writers
+    never lose updates. Returns the `returning` columns of the touched rows.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    qn = connection.ops.quote_name
+    columns = [*key_fields, *value_fields]
+    results = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), ROLLUP_CHUNK_SIZE):
+            chunk = rows[start:start + ROLLUP_CHUNK_SIZE]
+            placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+            sql = (
+                f"INSERT INTO {table} ({', '.join(qn(column) for column in columns)}) "
+                f"VALUES {', '.join([placeholders] * len(chunk))} "
+                f"ON CONFLICT ({', '.join(qn(column) for column in key_fields)}) DO UPDATE SET "
+                + ', '.join(f"{qn(column)} = {table}.{qn(column)} + EXCLUDED.{qn(column)}" for column in value_fields)
+            )
+            if returning:
+                sql += f" RETURNING {', '.join(qn(column) for column in returning)}"
+            cursor.execute(sql, [value for row in chunk for value in row])
+            if returning:
+                results.extend(cursor.fetchall())
+    return results
+
+
+def upsert_after_commit(model, key_fields, value_fields, rows):
+    """
+    additive_upsert() run once the current transaction commits (right away outside one).
+    Rollup rows are shared by every writer of an event, hour or day: updating them inside the
+    check-in transaction would hold their row lock until commit and queue the check-ins on it.
+    A worker that dies between the commit and the upsert leaves a drift that
+    `manage.py rebuild_rollups` repairs.
+    """
+    transaction.on_commit(lambda: additive_upsert(model, key_fields, value_fields, rows), robust=True)
+
+
+def checkin_hour(check_in_time):
+    """Start of the hour of `check_in_time` in the project TIME_ZONE."""
+    return timezone.localtime(check_in_time).replace(minute=0, second=0, microsecond=0)
+
+
+def apply_event_stats_changes(deltas):
+    """Adds {event_id: {field: delta}} to EventStats (fields from EVENT_STATS_FIELDS) after commit."""
+    rows = [
+        (event_id, *(delta.get(field, 0) for field in EVENT_STATS_FIELDS))
+        for event_id, delta in sorted(deltas.items())
+        if any(delta.values())
+    ]
+    if rows:
+        upsert_after_commit(EventStats, ('event_id',), EVENT_STATS_FIELDS, rows)
+
+
+def apply_checkin_changes(removed=(), added=()):
+    """
+    Moves removed/added check-in states (see Attendance.checkin_state) in the hourly
+    check-in rollup and in the per-event check-in totals, after commit. None states are ignored.
+    """
+    hourly = defaultdict(int)
+    per_event = defaultdict(int)
+    for sign, states in ((-1, removed), (1, added)):
+        for state in states:
+            if state is None:
+                continue
+            event_id, check_in_time = state
+            hourly[(event_id, checkin_hour(check_in_time))] += sign
+            per_event[event_id] += sign
+    rows = [(event_id, hour, count) for (event_id, hour), count in sorted(hourly.items()) if count]
+    if rows:
+        upsert_after_commit(CheckInHourlyStats, ('event_id', 'hour'), ('check_ins',), rows)
+    apply_event_stats_changes({event_id: {'check_ins': count} for event_id, count in per_event.items()})
+
+
+def apply_certificate_changes(removed=(), added=()):
+    """Moves removed/added certificate issue dates in the daily certificates rollup, after commit."""
+    daily = defaultdict(int)
+    for sign, days in ((-1, removed), (1, added)):
+        for day in days:
+            daily[day] += sign
+    rows = [(day, count) for day, count in sorted(daily.items()) if count]
+    if rows:
+        upsert_after_commit(CertificateDailyStats, ('day',), ('issued',), rows)
+
+
+def expected_rollups():
+    """Rollup contents computed from the raw Attendance and Certificate rows."""
+    closed = Q(check_in_time__isnull=False, check_out_time__isnull=False)
+    event_stats = {
+        row['event_id']: (row['participants'], row['check_ins'], row['sessions'], row['hours'] or Decimal('0.00'))
+        for row in Attendance.objects.values('event_id').annotate(
+            participants=Count('participant_id', filter=closed, distinct=True),
+            check_ins=Count('id', filter=Q(check_in_time__isnull=False)),
+            sessions=Count('id', filter=closed),
+            hours=Sum('calculated_hours', filter=closed)
+        ).order_by()
+    }
+    hourly = {
+        (row['event_id'], row['hour']): row['check_ins']
+        for row in Attendance.objects.filter(check_in_time__isnull=False).annotate(
+            hour=TruncHour('check_in_time', tzinfo=timezone.get_current_timezone())
+        ).values('event_id', 'hour').annotate(check_ins=Count('id')).order_by()
+    }
+    daily = {
+        row['issue_date']: row['issued']
+        for row in Certificate.objects.values('issue_date').annotate(issued=Count('id')).order_by()
+    }
+    return event_stats, hourly, daily
+
+
+def current_rollups():
+    event_stats = {
+        row[0]: row[1:]
+        for row in EventStats.objects.values_list('event_id', *EVENT_STATS_FIELDS)
+        if any(row[1:])
+    }
+    hourly = {
+        (event_id, hour): check_ins
+        for event_id, hour, check_ins in CheckInHourlyStats.objects.exclude(check_ins=0).values_list('event_id', 'hour', 'check_ins')
+    }
+    daily = dict(CertificateDailyStats.objects.exclude(issued=0).values_list('day', 'issued'))
+    return event_stats, hourly, daily
+
+
+def find_rollup_mismatches():
+    """Returns [(rollup name, key, expected, current)] for every rollup row that differs from the raw data."""
+    mismatches = []
+    for name, expected, current in zip(('event', 'hourly', 'daily'), expected_rollups(), current_rollups()):
+        mismatches.extend(
+            (name, key, expected.get(key), current.get(key))
+            for key in sorted(expected.keys() | current.keys(), key=str)
+            if expected.get(key) != current.get(key)
+        )
+    return mismatches
+
+
+def rebuild_rollups():
+    """Rewrites every rollup table from the raw data. Returns the mismatches found."""
+    with transaction.atomic():
+        mismatches = find_rollup_mismatches()
+        if mismatches:
+            event_stats, hourly, daily = expected_rollups()
+            EventStats.objects.all().delete()
+            CheckInHourlyStats.objects.all().delete()
+            CertificateDailyStats.objects.all().delete()
+            EventStats.objects.bulk_create([
+                EventStats(event_id=event_id, **dict(zip(EVENT_STATS_FIELDS, values)))
+                for event_id, values in event_stats.items()
+            ], batch_size=ROLLUP_CHUNK_SIZE)
+            CheckInHourlyStats.objects.bulk_create([
+                CheckInHourlyStats(event_id=event_id, hour=hour, check_ins=check_ins)
+                for (event_id, hour), check_ins in hourly.items()
+            ], batch_size=ROLLUP_CHUNK_SIZE)
+            CertificateDailyStats.objects.bulk_create([
+                CertificateDailyStats(day=day, issued=issued) for day, issued in daily.items()
+            ], batch_size=ROLLUP_CHUNK_SIZE)
+    return mismatches
@@ -1,11 +1,51 @@
 # backend/api/serializers.py
 from rest_framework import serializers
-from .models import CustomUser, Event, Attendance, Certificate
+from .models import CustomUser, Event, Attendance, Certificate, ImportJob, STALE_IMPORT_MESSAGE
 from django.contrib.auth.hashers import make_password
-from django.db.models import Sum
-from decimal import Decimal
 
-class CustomUserSerializer(serializers.ModelSerializer):
+
+def requested_fields(request):
+    """Field names selected with ?fields=a,b on a GET request, or None for every field."""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Lets GET requests pick the output fields with ?fields=a,b (unknown names are ignored).
+    values_plan() tells whether the selection can be served straight from QuerySet.values().
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = requested_fields(self.context.get('request'))
+        if selected:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    def values_plan(self):
+        """
+        [(field name, ORM lookup, converter)] when every readable field is a plain column,
+        a primary key relation or a dotted lookup through foreign keys; None otherwise.
+        """
+        plan = []
+        for field in self._readable_fields:
+            if isinstance(field, (serializers.SerializerMethodField, serializers.FileField)) or field.source == '*':
+                return None
+            if isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.ReadOnlyField)):
+                converter = None # values() already returns the related id / raw value
+            elif isinstance(field, (serializers.RelatedField, serializers.BaseSerializer)):
+                return None
+            else:
+                converter = field.to_representation
+            plan.append((field.field_name, '__'.join(field.source_attrs), converter))
+        return plan
+
+
+class CustomUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = (
@@ -56,7 +96,7 @@ class EventSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     participant_username = serializers.ReadOnlyField(source='participant.username')
     event_name = serializers.ReadOnlyField(source='event.name')
 
@@ -68,9 +108,23 @@ class AttendanceSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('calculated_hours',)
 
+    def validate(self, attrs):
+        # Mirrors the unique_open_attendance constraint so admins get a 400 instead of an IntegrityError
+        def current(field):
+            return attrs[field] if field in attrs else getattr(self.instance, field, None)
+
+        participant, event = current('participant'), current('event')
+        if participant and event and current('check_out_time') is None:
+            open_attendances = Attendance.objects.filter(participant=participant, event=event, check_out_time__isnull=True)
+            if self.instance is not None:
+                open_attendances = open_attendances.exclude(pk=self.instance.pk)
+            if open_attendances.exists():
+                raise serializers.ValidationError('O participante já possui um check-in aberto para este evento.')
+        return attrs
+
     # Add validation if needed, e.g., check_out_time > check_in_time
 
-class CertificateSerializer(serializers.ModelSerializer):
+class CertificateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     participant_username = serializers.ReadOnlyField(source='participant.username')
     # Include details about the attended events if needed directly here, 
     # or handle this in a separate endpoint/view logic.
@@ -85,39 +139,85 @@ class CertificateSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('unique_code', 'issue_date', 'total_hours_at_generation', 'pdf_file', 'attended_events_details')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('include_events_details', True):
+            self.fields.pop('attended_events_details', None)
+
     def get_attended_events_details(self, obj):
-        # This method provides the detailed list of attended events for the certificate.
-        # It queries the Attendance records for the participant associated with this certificate.
-        # WARNING: This assumes the certificate covers ALL attendances up to its issue date.
-        # A more robust solution might link certificates to specific attendances or date ranges.
-        attendances = Attendance.objects.filter(
-            participant=obj.participant, 
-            check_in_time__isnull=False, 
-            check_out_time__isnull=False,
-            # Potentially filter by date range if certificate generation logic specifies it
-            # check_in_time__date__lte=obj.issue_date 
-        ).values('event__name').annotate(hours=Sum('calculated_hours')).order_by('event__name')
-        
-        details = []
-        for item in attendances:
-            details.append({
-                'event_name': item['event__name'],
-                'hours': item['hours']
-            })
-        return details
+        # Snapshot taken when the certificate was issued, so no Attendance queries here
+        return obj.attended_events()
 
 # Serializer for participant import (if needed)
 class ParticipantImportSerializer(serializers.Serializer):
     file = serializers.FileField()
 
+# Serializer for a background participant file import and its progress
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id', 'file', 'status', 'rows_read', 'inserted', 'skipped', 'failed',
+            'errors', 'message', 'created_by', 'created_at', 'finished_at'
+        )
+        read_only_fields = (
+            'status', 'rows_read', 'inserted', 'skipped', 'failed',
+            'errors', 'message', 'created_by', 'created_at', 'finished_at'
+        )
+        # The upload is private and deleted after the import: never echoed back
+        extra_kwargs = {'file': {'write_only': True, 'required': True, 'allow_empty_file': False}}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Reported as failed right away; the row itself is updated by the fail_stale_import_jobs command
+        if instance.is_stale():
+            data.update(status='failed', message=STALE_IMPORT_MESSAGE)
+        return data
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(('.csv', '.xlsx')):
+            raise serializers.ValidationError('Formato de arquivo não suportado. Envie um arquivo .csv ou .xlsx.')
+        return value
+
+# Serializer for issuing an event check-in QR token
+class CheckinTokenSerializer(serializers.Serializer):
+    lifetime = serializers.IntegerField(min_value=30, required=False, help_text="Validade do QR Code em segundos.")
+
 # Serializer for Check-in (using QR code data)
 class CheckinSerializer(serializers.Serializer):
     event_id = serializers.IntegerField()
-    # QR code might contain a unique token or directly the user ID/event ID
+    # Signed token issued by /api/events/<id>/checkin-token/ (see api/qr_tokens.py)
     qr_code_data = serializers.CharField()
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
 
+# Serializer for one check-in/check-out captured offline by a scanner device
+class AttendanceSyncItemSerializer(serializers.Serializer):
+    ACTION_CHOICES = (
+        ('check_in', 'Check-in'),
+        ('check_out', 'Check-out'),
+    )
+    client_id = serializers.CharField(max_length=100) # Device-side id, echoed back in the result
+    action = serializers.ChoiceField(choices=ACTION_CHOICES)
+    event_id = serializers.IntegerField()
+    participant_id = serializers.IntegerField()
+    timestamp = serializers.DateTimeField()
+
+# Serializer for batch certificate issuance (event, list of events and/or date range)
+class CertificateBatchSerializer(serializers.Serializer):
+    event_id = serializers.IntegerField(required=False)
+    event_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.get(key) for key in ('event_id', 'event_ids', 'start_date', 'end_date')):
+            raise serializers.ValidationError('Informe um evento, uma lista de eventos ou um intervalo de datas.')
+        start_date, end_date = attrs.get('start_date'), attrs.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError('A data inicial deve ser anterior ou igual à data final.')
+        return attrs
+
 # Serializer for Certificate Validation
 class CertificateValidationSerializer(serializers.Serializer):
     unique_code = serializers.UUIDField()
@@ -0,0 +1,78 @@
+# backend/api/signals.py
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import active_events, certificate_validation_cache, user_cache
+from .ledger import apply_attendance_changes
+from .models import Attendance, Certificate, CustomUser, Event, HoursLedger
+from .rollups import apply_certificate_changes, apply_checkin_changes, apply_event_stats_changes
+
+
+def _deleted_through(origin, model):
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_save, sender=Attendance)
+def update_ledger_on_attendance_save(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata, rebuild the ledger and rollups afterwards
+        return
+    new_state = instance.ledger_state()
+    apply_attendance_changes(removed=[getattr(instance, '_ledger_state', None)], added=[new_state])
+    instance._ledger_state = new_state
+
+    new_checkin = instance.checkin_state()
+    old_checkin = getattr(instance, '_checkin_state', None)
+    if new_checkin != old_checkin:
+        apply_checkin_changes(removed=[old_checkin], added=[new_checkin])
+    instance._checkin_state = new_checkin
+
+
+@receiver(post_delete, sender=Attendance)
+def update_ledger_on_attendance_delete(sender, instance, origin=None, **kwargs):
+    # Deleting an event cascades to its ledger entries and rollups as well
+    if _deleted_through(origin, Event):
+        return
+    state = instance._ledger_state if hasattr(instance, '_ledger_state') else instance.ledger_state()
+    checkin = instance._checkin_state if hasattr(instance, '_checkin_state') else instance.checkin_state()
+    if origin is None or _deleted_through(origin, Attendance):
+        apply_attendance_changes(removed=[state])
+    elif state is not None:
+        # Deleting a participant cascades to the ledger entries; the participant counts
+        # were already taken out in remove_deleted_participant_from_rollups
+        apply_event_stats_changes({state[1]: {'sessions': -1, 'hours': -state[2]}})
+    apply_checkin_changes(removed=[checkin])
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remove_deleted_participant_from_rollups(sender, instance, **kwargs):
+    event_ids = HoursLedger.objects.filter(participant=instance, sessions__gt=0).values_list('event_id', flat=True)
+    apply_event_stats_changes({event_id: {'participants': -1} for event_id in event_ids})
+
+
+@receiver(post_save, sender=Certificate)
+def count_issued_certificate(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        apply_certificate_changes(added=[instance.issue_date])
+
+
+@receiver(post_delete, sender=Certificate)
+def uncount_deleted_certificate(sender, instance, **kwargs):
+    apply_certificate_changes(removed=[instance.issue_date])
+
+
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def drop_cached_certificate_validation(sender, instance, **kwargs):
+    certificate_validation_cache.pop(instance.unique_code)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_active_events(sender, **kwargs):
+    active_events.invalidate()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    user_cache.pop(instance.pk)
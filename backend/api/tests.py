@@ -1,3 +1,940 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import threading
+import uuid
+import zipfile
+from base64 import b64encode
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import QuerySet, Sum
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from reportlab.pdfgen import canvas
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .authentication import RoleTokenObtainPairSerializer
+from .cache import ActiveEventCache, active_events
+from .certificate_template import CERTIFICATE_TEMPLATE
+from .importers import run_participant_import
+from .ledger import find_ledger_mismatches
+from .models import Attendance, Certificate, CustomUser, Event, EventStats, HoursLedger, ImportJob, Participant
+from .pagination import AttendancePagination, CertificatePagination
+from .qr_tokens import issue_checkin_token
+from .renderers import FastJSONParser, FastJSONRenderer, orjson
+from .rollups import find_rollup_mismatches
+from .views import record_check_in, record_check_out
+
+
+class APITestData:
+    """Helpers shared by the test cases below."""
+
+    @classmethod
+    def create_user(cls, username, role='participant'):
+        # No password: tests authenticate with tokens, and hashing one is slow
+        return CustomUser.objects.create_user(username, f'{username}@example.com', role=role)
+
+    @classmethod
+    def create_event(cls, name, start=None, hours=4):
+        start = start or timezone.now() - timedelta(hours=1)
+        return Event.objects.create(
+            name=name, description='', location='Auditório', total_workload=hours,
+            start_date=start, end_date=start + timedelta(hours=hours)
+        )
+
+    @classmethod
+    def create_session(cls, participant, event, hours=4):
+        return Attendance.objects.create(
+            participant=participant, event=event,
+            check_in_time=event.start_date, check_out_time=event.start_date + timedelta(hours=hours)
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}')
+        return client
+
+
+class RoleJWTAuthenticationTests(APITestData, TestCase):
+    def test_exports_check_the_current_role(self):
+        admin = self.create_user('admin', role='admin')
+        event = self.create_event('Evento')
+        client = self.client_for(admin)
+        admin.role = 'participant'
+        admin.save(update_fields=['role'])
+
+        # Plain reads trust the token claims until it expires; exports reload the user
+        self.assertEqual(client.get('/api/participants/import-jobs/').status_code, 403)
+        self.assertEqual(client.get(f'/api/events/{event.pk}/attendance-report/').status_code, 403)
+        self.assertEqual(client.get(f'/api/events/{event.pk}/certificates-zip/').status_code, 403)
+        self.assertEqual(client.get('/api/dashboard/stats/').status_code, 200)
+
+
+class CertificateBatchTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', role='admin')
+        cls.participant = cls.create_user('ana')
+        cls.first = cls.create_event('Primeiro', start=timezone.now() - timedelta(days=2))
+        cls.second = cls.create_event('Segundo', start=timezone.now() - timedelta(days=1))
+        cls.create_session(cls.participant, cls.first)
+        cls.create_session(cls.participant, cls.second)
+
+    def generate(self, **data):
+        return self.client_for(self.admin).post('/api/certificates/generate-batch/', data, format='json')
+
+    def test_same_hours_for_another_event_is_issued(self):
+        self.assertEqual(self.generate(event_id=self.first.pk).data['created_count'], 1)
+        response = self.generate(event_id=self.second.pk)
+        self.assertEqual(response.data['created_count'], 1)
+        self.assertEqual(
+            [certificate.events_breakdown[0]['event_id'] for certificate in Certificate.objects.order_by('id')],
+            [self.first.pk, self.second.pk]
+        )
+
+    def test_events_without_remaining_sessions_are_left_out(self):
+        Attendance.objects.get(participant=self.participant, event=self.second).delete()
+        self.generate(event_ids=[self.first.pk, self.second.pk])
+        self.assertEqual(
+            [item['event_id'] for item in Certificate.objects.get().events_breakdown], [self.first.pk]
+        )
+
+    def test_same_events_are_not_issued_twice(self):
+        self.generate(event_ids=[self.first.pk, self.second.pk])
+        response = self.generate(event_ids=[self.second.pk, self.first.pk])
+        self.assertEqual(response.data['created_count'], 0)
+        self.assertEqual(response.data['results'][0]['status'], 'skipped')
+
+
+class CertificateValidationTests(APITestData, TestCase):
+    def setUp(self):
+        self.certificate = Certificate.objects.create(
+            participant=self.create_user('ana'), total_hours_at_generation=Decimal('4.00'), events_breakdown=[]
+        )
+        self.url = f'/api/certificates/validate/{self.certificate.unique_code}/'
+
+    def test_cache_headers_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_hours'], Decimal('4.00'))
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.CERTIFICATE_VALIDATION_MAX_AGE}')
+        etag = response['ETag']
+
+        # Served from the in-process cache
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, headers={'If-None-Match': '"outro"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_changed_certificate_gets_a_fresh_body(self):
+        etag = self.client.get(self.url)['ETag']
+        self.certificate.total_hours_at_generation = Decimal('6.00')
+        self.certificate.save()
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_hours'], Decimal('6.00'))
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_code(self):
+        response = self.client.get(f'/api/certificates/validate/{uuid.uuid4()}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['is_valid'])
+
+
+class EventCertificatesZipTests(APITestData, TestCase):
+    def test_only_certificates_for_the_event(self):
+        admin = self.create_user('admin', role='admin')
+        participant = self.create_user('ana')
+        event, other = self.create_event('Evento'), self.create_event('Outro')
+        self.create_session(participant, event)
+        self.create_session(participant, other)
+        generate = self.client_for(admin).post
+        generate('/api/certificates/generate-batch/', {'event_id': event.pk}, format='json')
+        generate('/api/certificates/generate-batch/', {'event_id': other.pk}, format='json')
+
+        response = self.client_for(admin).get(f'/api/events/{event.pk}/certificates-zip/')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            names = archive.namelist()
+        certificate = Certificate.objects.get(events_breakdown__0__event_id=event.pk)
+        self.assertEqual(names, [f'certificado_ana_{certificate.unique_code}.pdf'])
+
+
+class CertificateTemplateTests(SimpleTestCase):
+    def render(self, events):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer, pagesize=CERTIFICATE_TEMPLATE.pagesize, pageCompression=0)
+        CERTIFICATE_TEMPLATE.render(
+            p, participant_name='Ana', total_hours=Decimal('12.50'), issue_date=date(2025, 5, 20),
+            unique_code=uuid.uuid4(), draw_qr=lambda p, x, y, size: None,
+            event_rows=[(f'Oficina {index}', Decimal('2.50')) for index in range(events)]
+        )
+        used = [form for form in CERTIFICATE_TEMPLATE._forms if p.hasForm(form)]
+        p.save()
+        return used, buffer.getvalue()
+
+    def test_forms_are_written_once_and_only_when_used(self):
+        template = CERTIFICATE_TEMPLATE
+        used, pdf = self.render(events=5)
+        self.assertEqual(used, [template.FRONT_FORM, template.DETAILS_FORM])
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 2)
+
+        # 60 events take two continuation pages, both drawing the same form
+        used, pdf = self.render(events=60)
+        self.assertEqual(used, [template.FRONT_FORM, template.DETAILS_FORM, template.DETAILS_CONTINUED_FORM])
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 3)
+        self.assertEqual(pdf.count(b'/FormXob.certificate_details_continued Do'), 2)
+
+
+@skipUnless(orjson, 'orjson is not installed')
+class FastJSONTests(SimpleTestCase):
+    def test_same_output_as_drf(self):
+        for data in (
+            {
+                'id': 2**63, 'negative': -2**63, 'ratio': 0.1, 'flag': True, 'missing': None,
+                'when': timezone.now(), 'day': date(2025, 5, 20), 'at': time(9, 30, 15, 123456),
+                'hours': Decimal('4.50'), 'code': uuid.uuid4(), 'text': 'Sessão\u2028nova\u2029', 7: [1, 'a'],
+            },
+            {'results': [{'id': 2**64}, {'id': -2**63 - 1}]}, # Beyond orjson's integers
+        ):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def parse(self, parser, body):
+        try:
+            return parser.parse(io.BytesIO(body))
+        except ParseError as exc:
+            return str(exc.detail)
+
+    def test_same_result_and_errors_as_drf(self):
+        for body in (b'{"a": [1, "\\ud83d\\ude00"]}', b'{"a": }', b'[NaN]', b'[Infinity]', b'"\xff"', b''):
+            self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+
+class QueryCountTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', role='admin')
+        cls.events = [cls.create_event(f'Evento {index}') for index in range(3)]
+        for index in range(30):
+            participant = cls.create_user(f'participante{index}')
+            for event in cls.events:
+                cls.create_session(participant, event)
+            Certificate.objects.create(
+                participant=participant, total_hours_at_generation=12,
+                events_breakdown=[
+                    {'event_id': event.pk, 'event_name': event.name, 'hours': '4.00'} for event in cls.events
+                ]
+            )
+
+    def test_certificate_list_queries_do_not_grow_with_page_size(self):
+        client = self.client_for(self.admin)
+        for page_size in (5, 30):
+            # The page query; the event breakdown comes from each certificate's snapshot
+            with self.assertNumQueries(1):
+                response = client.get('/api/certificates/', {'page_size': page_size})
+            self.assertEqual(len(response.data['results']), page_size)
+            self.assertEqual(len(response.data['results'][0]['attended_events_details']), 3)
+
+    def test_attendance_report_escapes_formulas(self):
+        participant = self.create_user('=HYPERLINK("http://example.com")')
+        participant.first_name, participant.last_name = '@SUM(A1:A9)', ''
+        participant.save(update_fields=['first_name', 'last_name'])
+        self.create_session(participant, self.events[0])
+        response = self.client_for(self.admin).get(f'/api/events/{self.events[0].pk}/attendance-report/')
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        row = next(csv.reader([line for line in lines if 'HYPERLINK' in line]))
+        self.assertEqual(row[1:3], ['\'=HYPERLINK("http://example.com")', "'@SUM(A1:A9)"])
+
+    def test_attendance_report_queries_do_not_grow_with_participants(self):
+        client = self.client_for(self.admin)
+        # The event, then the grouped rows streamed in chunks
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/events/{self.events[0].pk}/attendance-report/')
+            lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 31)
+
+
+class QueryPlanTests(APITestData, TestCase):
+    """The hot lookups are served by the indexes and constraints declared for them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.events = [cls.create_event(f'Evento {index}') for index in range(3)]
+        cls.participants = [cls.create_user(f'participante{index}') for index in range(20)]
+        for participant in cls.participants:
+            for event in cls.events:
+                cls.create_session(participant, event)
+            Attendance.objects.create(participant=participant, event=cls.events[0], check_in_time=timezone.now())
+            Certificate.objects.create(participant=participant, total_hours_at_generation=12)
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            # Tables this small are cheaper to scan; only whether the index applies matters here
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+                try:
+                    plan = queryset.explain()
+                finally:
+                    cursor.execute('RESET enable_seqscan')
+        else:
+            plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def keyset_page(self, pagination, queryset, reverse=False):
+        paginator = pagination()
+        paginator.fields = [(name.lstrip('-'), name.startswith('-')) for name in paginator.ordering]
+        return queryset.order_by(*paginator.order_by(reverse))[:paginator.page_size + 1]
+
+    def test_open_attendance_lookup(self):
+        self.assertUsesIndex(
+            Attendance.objects.filter(participant=self.participants[0], event=self.events[0], check_out_time__isnull=True),
+            'unique_open_attendance'
+        )
+
+    def test_closed_sessions_of_a_participant(self):
+        self.assertUsesIndex(
+            Attendance.objects.filter(
+                participant=self.participants[0], check_in_time__isnull=False, check_out_time__isnull=False
+            ).values('participant_id').annotate(hours=Sum('calculated_hours')),
+            'attendance_closed_idx'
+        )
+
+    def test_attendances_of_an_event_in_default_order(self):
+        self.assertUsesIndex(Attendance.objects.filter(event=self.events[1]), 'attendance_ordering_idx')
+
+    def test_certificates_of_a_participant(self):
+        self.assertUsesIndex(
+            Certificate.objects.filter(participant=self.participants[0]).order_by('-issue_date'),
+            'certificate_participant_idx'
+        )
+
+    def test_keyset_pages(self):
+        for reverse in (False, True):
+            self.assertUsesIndex(
+                self.keyset_page(AttendancePagination, Attendance.objects.all(), reverse), 'attendance_keyset_idx'
+            )
+            self.assertUsesIndex(
+                self.keyset_page(CertificatePagination, Certificate.objects.all(), reverse), 'certificate_keyset_idx'
+            )
+
+
+class KeysetPaginationTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', role='admin')
+        events = [cls.create_event(f'Evento {index}') for index in range(3)]
+        participants = [cls.create_user(f'participante{index}') for index in range(4)]
+        # Sessions of an event share their check-in time, so the id breaks the ties
+        for event in events:
+            for participant in participants:
+                cls.create_session(participant, event)
+        Attendance.objects.bulk_create([
+            Attendance(participant=participant, event=events[0], check_out_time=timezone.now())
+            for participant in participants[:3]
+        ])
+        rows = Attendance.objects.values_list('id', 'check_in_time')
+        # NULL check-in times sort as the largest value, so they come first in '-check_in_time'
+        cls.expected = [
+            pk for pk, _ in sorted(rows, key=lambda row: (row[1] is not None, row[1] and -row[1].timestamp(), -row[0]))
+        ]
+
+    def walk(self, client, url, direction):
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data[direction]
+        return pages, response.data
+
+    def test_next_and_previous_cursors_walk_the_whole_ordering(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(self.expected[:3], sorted(
+            Attendance.objects.filter(check_in_time__isnull=True).values_list('id', flat=True), reverse=True
+        ))
+        # Page boundaries both inside the NULL check-ins and inside the ties; instances and the values() path
+        for page_size in (2, 4):
+            for query in ('', '&fields=id,check_in_time'):
+                with self.subTest(page_size=page_size, query=query):
+                    forward, last = self.walk(client, f'/api/attendances/?page_size={page_size}{query}', 'next')
+                    self.assertEqual(sum(forward, []), self.expected)
+                    self.assertTrue(all(len(page) == page_size for page in forward[:-1]))
+
+                    backward, first = self.walk(client, last['previous'], 'previous')
+                    self.assertEqual(backward, forward[-2::-1])
+                    self.assertIsNone(first['previous'])
+
+    def test_count_is_opt_in(self):
+        client = self.client_for(self.admin)
+        with self.assertNumQueries(1):
+            response = client.get('/api/attendances/', {'page_size': 4})
+        self.assertNotIn('count', response.data)
+
+        with self.assertNumQueries(2):
+            response = client.get('/api/attendances/', {'page_size': 4, 'count': 'true'})
+        self.assertEqual(response.data['count'], len(self.expected))
+        # Kept on the links
+        self.assertEqual(client.get(response.data['next']).data['count'], len(self.expected))
+
+    def test_tampered_cursor_is_rejected(self):
+        def encode(payload):
+            return b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+        client = self.client_for(self.admin)
+        for cursor in (
+            'not base64!', encode('not a position'), encode({'p': [None]}),
+            encode({'p': ['yesterday', 1]}), encode({'p': [None, 'one']}), encode({'r': 1}),
+        ):
+            with self.subTest(cursor=cursor):
+                response = client.get('/api/attendances/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Cursor inválido.')
+
+
+class HoursLedgerTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.participant = cls.create_user('ana')
+        cls.other = cls.create_user('bruno')
+        cls.first, cls.second = cls.create_event('Primeiro'), cls.create_event('Segundo')
+
+    def ledger(self):
+        return {
+            (participant_id, event_id): (hours, sessions)
+            for participant_id, event_id, hours, sessions in HoursLedger.objects.filter(sessions__gt=0).values_list(
+                'participant_id', 'event_id', 'hours', 'sessions'
+            )
+        }
+
+    def test_ledger_follows_attendance_changes(self):
+        attendance = self.create_session(self.participant, self.first, hours=2)
+        self.create_session(self.participant, self.first, hours=3)
+        self.create_session(self.other, self.second)
+        self.assertEqual(self.ledger()[(self.participant.pk, self.first.pk)], (Decimal('5.00'), 2))
+
+        # Moved to another event
+        attendance.event = self.second
+        attendance.save()
+        self.assertEqual(find_ledger_mismatches(), [])
+        self.assertEqual(self.ledger()[(self.participant.pk, self.second.pk)], (Decimal('2.00'), 1))
+
+        # Reopened, then closed again with other hours
+        attendance.check_out_time = None
+        attendance.save()
+        self.assertEqual(find_ledger_mismatches(), [])
+        self.assertNotIn((self.participant.pk, self.second.pk), self.ledger())
+        attendance.check_out_time = attendance.check_in_time + timedelta(hours=1)
+        attendance.save()
+        self.assertEqual(find_ledger_mismatches(), [])
+
+        # Deleted one by one, in bulk and through the participant
+        attendance.delete()
+        Attendance.objects.filter(event=self.first).delete()
+        self.assertEqual(find_ledger_mismatches(), [])
+        self.other.delete()
+        self.assertEqual(find_ledger_mismatches(), [])
+        self.assertEqual(self.ledger(), {})
+
+    def test_rebuild_command_repairs_the_ledger(self):
+        self.create_session(self.participant, self.first, hours=2)
+        self.create_session(self.other, self.first, hours=3)
+        HoursLedger.objects.filter(participant=self.participant).update(hours=Decimal('7.00'), sessions=4)
+        HoursLedger.objects.filter(participant=self.other).delete()
+        self.assertEqual(len(find_ledger_mismatches()), 2)
+
+        output = io.StringIO()
+        call_command('rebuild_hours_ledger', stdout=output)
+
+        self.assertIn('2 ledger entries rebuilt.', output.getvalue())
+        self.assertEqual(find_ledger_mismatches(), [])
+        self.assertEqual(self.ledger(), {
+            (self.participant.pk, self.first.pk): (Decimal('2.00'), 1),
+            (self.other.pk, self.first.pk): (Decimal('3.00'), 1),
+        })
+
+
+class RollupTests(APITestData, TestCase):
+    def test_check_in_rollups_are_updated_after_commit(self):
+        participant = self.create_user('ana')
+        event = self.create_event('Evento')
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                attendance_id = record_check_in(participant.pk, event.pk, timezone.now())
+                # The shared EventStats row is not locked by the check-in transaction
+                self.assertFalse(EventStats.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(EventStats.objects.get(event=event).check_ins, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_check_out(Attendance.objects.get(pk=attendance_id), timezone.now() + timedelta(hours=1))
+        self.assertEqual(find_rollup_mismatches(), [])
+
+
+class CheckInTokenTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.participant = cls.create_user('ana')
+        cls.event = cls.create_event('Evento')
+        cls.other = cls.create_event('Outro')
+
+    def check_in(self, token, event=None):
+        data = {'event_id': (event or self.event).pk}
+        if token is not None:
+            data['qr_code_data'] = token
+        return self.client_for(self.participant).post('/api/attendances/check_in/', data, format='json')
+
+    def token(self, event=None, valid_from=None, valid_until=None):
+        now = timezone.now()
+        return issue_checkin_token(
+            (event or self.event).pk, valid_from or now - timedelta(minutes=1), valid_until or now + timedelta(minutes=5)
+        )
+
+    def assertRejected(self, response, error):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': error})
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_valid_token(self):
+        response = self.check_in(self.token())
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Attendance.objects.filter(participant=self.participant, event=self.event).exists())
+
+    def test_forged_signature(self):
+        with override_settings(CHECKIN_QR_KEYS=['outra-chave']):
+            forged = self.token()
+        self.assertRejected(self.check_in(forged), 'QR Code inválido.')
+        # Payload edited without re-signing
+        payload, signature = self.token().split(':', 1)
+        self.assertRejected(self.check_in(f'{payload}x:{signature}'), 'QR Code inválido.')
+
+    def test_expired_token(self):
+        now = timezone.now()
+        token = self.token(valid_from=now - timedelta(hours=1), valid_until=now - timedelta(minutes=5))
+        self.assertRejected(self.check_in(token), 'QR Code expirado.')
+
+    def test_token_not_yet_valid(self):
+        now = timezone.now()
+        token = self.token(valid_from=now + timedelta(minutes=5), valid_until=now + timedelta(minutes=10))
+        self.assertRejected(self.check_in(token), 'QR Code ainda não é válido.')
+
+    def test_token_for_another_event(self):
+        self.assertRejected(self.check_in(self.token(event=self.other)), 'QR Code não corresponde a este evento.')
+
+    def test_token_signed_with_a_rotated_key(self):
+        with override_settings(CHECKIN_QR_KEYS=['chave-antiga']):
+            token = self.token()
+        with override_settings(CHECKIN_QR_KEYS=['chave-nova', 'chave-antiga']):
+            self.assertEqual(self.check_in(token).status_code, 201)
+
+    def test_key_dropped_after_rotation(self):
+        with override_settings(CHECKIN_QR_KEYS=['chave-antiga']):
+            token = self.token()
+        with override_settings(CHECKIN_QR_KEYS=['chave-nova']):
+            self.assertRejected(self.check_in(token), 'QR Code inválido.')
+
+    def test_missing_token(self):
+        for token in (None, ''):
+            response = self.check_in(token)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('qr_code_data', response.data)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class ActiveEventCheckInTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.participant = cls.create_user('ana')
+
+    def check_in(self, event_id):
+        now = timezone.now()
+        token = issue_checkin_token(event_id, now - timedelta(minutes=1), now + timedelta(minutes=5))
+        return self.client_for(self.participant).post(
+            '/api/attendances/check_in/', {'event_id': event_id, 'qr_code_data': token}, format='json'
+        )
+
+    def test_outside_the_event_window(self):
+        for start in (timezone.now() + timedelta(hours=2), timezone.now() - timedelta(days=1)):
+            event = self.create_event('Evento', start=start)
+            response = self.check_in(event.pk)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'error': 'Evento não está ativo no momento.'})
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_missing_event(self):
+        response = self.check_in(999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {'error': 'Evento não encontrado.'})
+
+    def test_event_edited_while_cached(self):
+        event = self.create_event('Evento')
+        self.assertIsNotNone(active_events.get(event.pk))
+        event.end_date = timezone.now() - timedelta(minutes=1)
+        event.save()
+        self.assertEqual(self.check_in(event.pk).status_code, 400)
+
+        event.end_date = timezone.now() + timedelta(hours=1)
+        event.save()
+        self.assertEqual(self.check_in(event.pk).status_code, 201)
+
+    def test_event_deleted_while_cached(self):
+        event = self.create_event('Evento')
+        self.assertIsNotNone(active_events.get(event.pk))
+        event_id = event.pk
+        event.delete()
+        self.assertIsNone(active_events.get(event_id))
+        response = self.check_in(event_id)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {'error': 'Evento não encontrado.'})
+
+    def test_snapshot_is_reused_until_invalidated(self):
+        cache = ActiveEventCache(ttl=60)
+        event = self.create_event('Evento')
+        with self.assertNumQueries(1):
+            self.assertEqual(cache.get(event.pk).id, event.pk)
+            self.assertIsNone(cache.get(999999))
+        cache.invalidate()
+        with self.assertNumQueries(1):
+            cache.get(event.pk)
+
+
+class AsyncCheckInViewTests(APITestData, TestCase):
+    """The async check-in views answer like the DRF actions they mirror, requested the same way through AsyncClient."""
+    CHECK_IN = {'sync': '/api/attendances/check_in/', 'async': '/api/async/attendances/check-in/'}
+    CHECK_OUT = {'sync': '/api/attendances/{}/check_out/', 'async': '/api/async/attendances/{}/check-out/'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = cls.create_event('Evento')
+        cls.admin = cls.create_user('admin', role='admin')
+        cls.participants = {kind: cls.create_user(f'participante_{kind}') for kind in cls.CHECK_IN}
+
+    def authorization(self, user):
+        return {'Authorization': f'Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}'}
+
+    def check_in_body(self):
+        now = timezone.now()
+        return json.dumps({
+            'event_id': self.event.pk,
+            'qr_code_data': issue_checkin_token(self.event.pk, now - timedelta(minutes=1), now + timedelta(minutes=5)),
+        })
+
+    async def request_both(self, urls, method='post', user=None, participant=False, **kwargs):
+        """The same request to the sync and the async view, as {kind: response}; with `participant`, each view's own."""
+        responses = {}
+        for kind, url in urls.items():
+            requester = self.participants[kind] if participant else user
+            headers = self.authorization(requester) if requester else {}
+            responses[kind] = await getattr(AsyncClient(), method)(url, headers=headers, **kwargs)
+        return responses
+
+    def assertSameResponse(self, responses, status_code):
+        for kind, response in responses.items():
+            with self.subTest(kind=kind):
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(responses['sync'].json(), responses['async'].json())
+
+    def check_out_urls(self, pk=1):
+        return {kind: url.format(pk) for kind, url in self.CHECK_OUT.items()}
+
+    async def test_missing_or_invalid_token(self):
+        for urls in (self.CHECK_IN, self.check_out_urls()):
+            for headers in ({}, {'Authorization': 'Bearer invalido'}):
+                responses = {
+                    kind: await AsyncClient().post(url, self.check_in_body(), content_type='application/json', headers=headers)
+                    for kind, url in urls.items()
+                }
+                self.assertSameResponse(responses, 401)
+                self.assertEqual(responses['sync']['WWW-Authenticate'], responses['async']['WWW-Authenticate'])
+                self.assertTrue(responses['async']['WWW-Authenticate'].startswith('Bearer'))
+
+    async def test_wrong_role(self):
+        for urls in (self.CHECK_IN, self.check_out_urls()):
+            responses = await self.request_both(
+                urls, user=self.admin, data=self.check_in_body(), content_type='application/json'
+            )
+            self.assertSameResponse(responses, 403)
+
+    async def test_method_not_allowed(self):
+        for urls in (self.CHECK_IN, self.check_out_urls()):
+            responses = await self.request_both(urls, method='get', participant=True)
+            self.assertSameResponse(responses, 405)
+            for response in responses.values():
+                self.assertIn('POST', response['Allow'])
+
+    async def test_unsupported_media_type(self):
+        responses = await self.request_both(
+            self.CHECK_IN, participant=True, data=self.check_in_body(), content_type='text/plain'
+        )
+        self.assertSameResponse(responses, 415)
+        self.assertFalse(await Attendance.objects.aexists())
+
+    async def test_valid_check_in_and_check_out(self):
+        responses = await self.request_both(
+            self.CHECK_IN, participant=True, data=self.check_in_body(), content_type='application/json'
+        )
+        for response in responses.values():
+            self.assertEqual(response.status_code, 201)
+        attendance_ids = {kind: response.json().pop('attendance_id') for kind, response in responses.items()}
+        self.assertEqual(
+            {kind: response.json()['status'] for kind, response in responses.items()},
+            dict.fromkeys(responses, 'Check-in realizado com sucesso.')
+        )
+        for kind, attendance_id in attendance_ids.items():
+            attendance = await Attendance.objects.aget(pk=attendance_id)
+            self.assertEqual(
+                (attendance.participant_id, attendance.event_id, attendance.check_out_time),
+                (self.participants[kind].pk, self.event.pk, None)
+            )
+
+        # Checked in already: both answer 200 without opening another attendance
+        responses = await self.request_both(
+            self.CHECK_IN, participant=True, data=self.check_in_body(), content_type='application/json'
+        )
+        self.assertSameResponse(responses, 200)
+        self.assertEqual(await Attendance.objects.acount(), 2)
+
+        responses = {}
+        for kind, attendance_id in attendance_ids.items():
+            responses[kind] = await AsyncClient().post(
+                self.CHECK_OUT[kind].format(attendance_id), headers=self.authorization(self.participants[kind])
+            )
+        self.assertSameResponse(responses, 200)
+        self.assertFalse(await Attendance.objects.filter(check_out_time__isnull=True).aexists())
+
+
+class OpenCheckInConcurrencyTests(APITestData, TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot write concurrently to an in-memory SQLite database')
+
+    def test_parallel_check_ins_open_one_attendance(self):
+        participant = self.create_user('ana')
+        event = self.create_event('Evento')
+        data = {
+            'event_id': event.pk,
+            'qr_code_data': issue_checkin_token(event.pk, event.start_date, event.end_date),
+        }
+        threads = 16
+        barrier = threading.Barrier(threads)
+        responses = []
+
+        def check_in():
+            client = self.client_for(participant)
+            try:
+                barrier.wait()
+                responses.append(client.post('/api/attendances/check_in/', data, format='json'))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=check_in) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200] * (threads - 1) + [201])
+        self.assertEqual(
+            {response.data['status'] for response in responses if response.status_code == 200},
+            {'Você já realizou o check-in para este evento e ainda não fez check-out.'}
+        )
+        self.assertEqual(Attendance.objects.filter(participant=participant, event=event, check_out_time__isnull=True).count(), 1)
+
+
+class AttendanceSyncTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = cls.create_user('admin', role='admin')
+        cls.participant = cls.create_user('ana')
+        cls.event = cls.create_event('Evento', start=timezone.now() - timedelta(hours=2))
+
+    def sync(self, *items, user=None):
+        items = [
+            dict({'client_id': str(index), 'event_id': self.event.pk, 'participant_id': self.participant.pk}, **item)
+            for index, item in enumerate(items)
+        ]
+        return self.client_for(user or self.admin).post('/api/attendances/sync/', {'items': items}, format='json')
+
+    def test_participants_cannot_sync(self):
+        start = self.event.start_date
+        response = self.sync(
+            {'action': 'check_in', 'timestamp': start},
+            {'action': 'check_out', 'timestamp': start + timedelta(hours=1)},
+            user=self.participant
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_session_within_the_event(self):
+        start = self.event.start_date
+        response = self.sync(
+            {'action': 'check_in', 'timestamp': start + timedelta(minutes=5)},
+            {'action': 'check_out', 'timestamp': start + timedelta(minutes=95)}
+        )
+        self.assertEqual([result['status'] for result in response.data['results']], ['checked_in', 'checked_out'])
+        self.assertEqual(response.data['results'][1]['calculated_hours'], Decimal('1.50'))
+
+    def test_timestamps_outside_the_event_or_in_the_future(self):
+        ended = self.create_event('Encerrado', start=timezone.now() - timedelta(days=60))
+        response = self.sync(
+            {'action': 'check_in', 'event_id': ended.pk, 'timestamp': ended.start_date},
+            {'action': 'check_out', 'event_id': ended.pk, 'timestamp': ended.start_date + timedelta(hours=960)},
+            {'action': 'check_in', 'timestamp': self.event.start_date - timedelta(minutes=1)},
+            {'action': 'check_in', 'timestamp': timezone.now() + timedelta(minutes=10)}
+        )
+        self.assertEqual(
+            [result.get('error') for result in response.data['results']],
+            [None, 'Horário fora do período do evento.', 'Horário fora do período do evento.', 'Horário posterior ao momento atual.']
+        )
+        self.assertEqual(Attendance.objects.filter(check_out_time__isnull=False).count(), 0)
+
+    def test_sessions_too_long_for_calculated_hours(self):
+        marathon = self.create_event('Maratona', start=timezone.now() - timedelta(hours=1100), hours=1200)
+        response = self.sync(
+            {'action': 'check_in', 'event_id': marathon.pk, 'timestamp': marathon.start_date},
+            {'action': 'check_out', 'event_id': marathon.pk, 'timestamp': marathon.start_date + timedelta(hours=1000)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][1]['error'], 'Duração da sessão excede o limite de horas.')
+
+    def test_open_attendance_without_check_in_time(self):
+        Attendance.objects.create(participant=self.participant, event=self.event, method='manual')
+        response = self.sync({'action': 'check_out', 'timestamp': self.event.start_date + timedelta(hours=1)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['error'], 'Registro de check-in sem horário de entrada.')
+
+
+    def test_open_attendance_created_after_the_lock(self):
+        # A live check-in committed between the lock on the open attendances and the insert
+        existing = Attendance.objects.create(
+            participant=self.participant, event=self.event, check_in_time=self.event.start_date, method='qrcode'
+        )
+        with mock.patch.object(QuerySet, 'select_for_update', lambda queryset, **kwargs: queryset.none()):
+            response = self.sync({'action': 'check_in', 'timestamp': self.event.start_date + timedelta(minutes=5)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created_count'], 0)
+        self.assertEqual(
+            response.data['results'][0],
+            {'client_id': '0', 'status': 'skipped', 'error': 'Check-in já aberto para este evento.', 'attendance_id': existing.pk}
+        )
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_participant_is_required(self):
+        response = self.client_for(self.admin).post('/api/attendances/sync/', {'items': [
+            {'client_id': '0', 'action': 'check_in', 'event_id': self.event.pk, 'timestamp': self.event.start_date}
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['error'], 'Dados inválidos.')
+        self.assertIn('participant_id', response.data['results'][0]['details'])
+
+
+class AttendanceImportTests(APITestData, TestCase):
+    def test_sessions_too_long_for_calculated_hours_are_rejected(self):
+        admin = self.create_user('admin', role='admin')
+        participant = self.create_user('ana')
+        event = self.create_event('Evento')
+        start = event.start_date
+        response = self.client_for(admin).post('/api/attendances/import/', [
+            {'email': participant.email, 'event_id': event.pk,
+             'check_in_time': start.isoformat(), 'check_out_time': (start + timedelta(hours=2)).isoformat()},
+            {'email': participant.email, 'event_id': event.pk,
+             'check_in_time': start.isoformat(), 'check_out_time': (start + timedelta(hours=1000)).isoformat()},
+        ], format='json')
+        self.assertEqual(response.data['imported_count'], 1)
+        self.assertEqual(response.data['failed_entries'][0]['reason'], 'Duração da sessão excede o limite de horas.')
+        self.assertEqual(Attendance.objects.get().calculated_hours, Decimal('2.00'))
+
+
+class ParticipantImportJobTests(APITestData, TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name)
+        patcher = mock.patch.object(ImportJob._meta.get_field('file'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = self.client_for(self.create_user('admin', role='admin'))
+
+    def test_uploaded_file_is_not_exposed_and_is_deleted_when_done(self):
+        upload = SimpleUploadedFile('participantes.csv', b'name,email\nAna,ana@example.com\n')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/participants/import-jobs/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('file', response.data)
+        self.assertEqual(len(callbacks), 1)
+        job = ImportJob.objects.get()
+        self.assertTrue(self.storage.exists(job.file.name))
+
+        # The thread's body, run inline (closing connections would end the test transaction)
+        with mock.patch('api.importers.close_old_connections'):
+            run_participant_import(job.pk)
+
+        self.assertFalse(self.storage.exists(job.file.name))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.inserted, job.file.name), ('done', 1, ''))
+        self.assertTrue(Participant.objects.filter(email='ana@example.com').exists())
+        self.assertNotIn('file', self.client.get(f'/api/participants/import-jobs/{job.pk}/').data)
+
+    def test_abandoned_jobs_are_reported_as_failed(self):
+        abandoned = ImportJob.objects.create(status='running')
+        abandoned.file.save('participantes.csv', ContentFile(b'name,email\n'))
+        running = ImportJob.objects.create(status='running')
+        ImportJob.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/participants/import-jobs/')
+
+        statuses = {job['id']: job['status'] for job in response.data['results']}
+        self.assertEqual(statuses, {abandoned.pk: 'failed', running.pk: 'running'})
+        # Reading never writes: the row and its file are left to the command
+        abandoned.refresh_from_db()
+        self.assertEqual(abandoned.status, 'running')
+        self.assertTrue(self.storage.exists(abandoned.file.name))
+
+    def test_fail_stale_command_marks_abandoned_jobs(self):
+        abandoned = ImportJob.objects.create(status='running')
+        abandoned.file.save('participantes.csv', ContentFile(b'name,email\n'))
+        file_name = abandoned.file.name
+        running = ImportJob.objects.create(status='running')
+        ImportJob.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        call_command('fail_stale_import_jobs', stdout=io.StringIO())
+
+        abandoned.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((abandoned.status, running.status), ('failed', 'running'))
+        self.assertIsNotNone(abandoned.finished_at)
+        self.assertEqual(abandoned.file.name, '')
+        self.assertFalse(self.storage.exists(file_name))
+
+
+class LiveEventStreamTests(APITestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = cls.create_event('Evento')
+        cls.token = str(RoleTokenObtainPairSerializer.get_token(cls.create_user('admin', role='admin')).access_token)
+
+    def test_not_served_under_wsgi(self):
+        response = Client().get(f'/api/events/{self.event.pk}/live/', {'token': self.token})
+        self.assertEqual(response.status_code, 501)
+
+    async def test_streams_under_asgi(self):
+        response = await AsyncClient().get(f'/api/events/{self.event.pk}/live/', {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
@@ -2,7 +2,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    CustomUserViewSet, EventViewSet, AttendanceViewSet, CertificateViewSet
+    CustomUserViewSet, EventViewSet, AttendanceViewSet, CertificateViewSet, ImportJobViewSet,
+    DashboardViewSet, live_event_stream, async_check_in, async_check_out
 )
 
 router = DefaultRouter()
@@ -10,6 +11,8 @@ router.register(r'users', CustomUserViewSet)
 router.register(r'events', EventViewSet)
 router.register(r'attendances', AttendanceViewSet)
 router.register(r'certificates', CertificateViewSet)
+router.register(r'participants/import-jobs', ImportJobViewSet)
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -22,5 +25,10 @@ urlpatterns = [
     path('certificates/generate/', CertificateViewSet.as_view({"post": "generate_certificate"}), name='certificate-generate'),
     # Endpoint for user profile
     path('users/me/', CustomUserViewSet.as_view({"get": "me"}), name='user-me'),
+    # Server-sent events with live attendance counts (ASGI only, 501 under WSGI)
+    path('events/<int:event_id>/live/', live_event_stream, name='event-live'),
+    # Async check-in/check-out, same contract as the two routes above (serve under ASGI)
+    path('async/attendances/check-in/', async_check_in, name='attendance-check-in-async'),
+    path('async/attendances/<int:pk>/check-out/', async_check_out, name='attendance-check-out-async'),
 ]
 
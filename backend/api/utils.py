@@ -1,138 +1,184 @@
 # backend/api/utils.py
 import qrcode
+import csv
 import io
+import zipfile
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
 from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph
-from django.conf import settings
-from django.urls import reverse # To build validation URL
-from .models import Attendance
-from django.db.models import Sum
-import os # For cleaning up QR code temp file
-
-def generate_qr_code_img(data):
-    """Generates a QR code image object in memory."""
+from django.core.files.base import ContentFile
+from .certificate_template import CERTIFICATE_TEMPLATE
+import os
+
+# Bump whenever the certificate layout changes: stored PDFs are keyed by this
+# version, so older renders are discarded and regenerated on their next download.
+CERTIFICATE_TEMPLATE_VERSION = 4
+
+@lru_cache(maxsize=1024)
+def qr_code_matrix(data):
+    """Returns the QR code modules (border included) for the data, memoized per value."""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
         border=4,
     )
     qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    return img
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+def draw_qr_code(p, data, x, y, size):
+    """Draws the QR code as vector modules in the square with lower-left corner (x, y)."""
+    matrix = qr_code_matrix(data)
+    module = size / len(matrix)
+    path = p.beginPath()
+    for row_index, row in enumerate(matrix):
+        row_y = y + size - (row_index + 1) * module
+        column = 0
+        # Each horizontal run of dark modules becomes a single rectangle
+        while column < len(row):
+            if not row[column]:
+                column += 1
+                continue
+            run_start = column
+            while column < len(row) and row[column]:
+                column += 1
+            path.rect(x + run_start * module, row_y, (column - run_start) * module, module)
+    p.saveState()
+    p.setFillColorRGB(0, 0, 0)
+    p.drawPath(path, stroke=0, fill=1)
+    p.restoreState()
 
 def generate_certificate_pdf(buffer, certificate):
     """Generates the certificate PDF content into the provided buffer."""
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    styles = getSampleStyleSheet()
-    style_normal = styles["Normal"]
-    style_normal.fontSize = 10
-    style_bold = styles["h6"]
-    style_bold.fontSize = 11
-
-    # --- Page 1: Main Certificate --- 
-    p.setFont("Helvetica-Bold", 24)
-    p.drawCentredString(width / 2.0, height - 1.5*inch, "CERTIFICADO DE PARTICIPAÇÃO")
-
-    p.setFont("Helvetica", 12)
-    text_y = height - 3*inch
-    p.drawString(inch, text_y, f"Certificamos que")
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(inch + 1.2*inch, text_y, f"{certificate.participant.get_full_name() or certificate.participant.username}")
-    
-    p.setFont("Helvetica", 12)
-    text_y -= 0.5*inch
-    p.drawString(inch, text_y, f"participou de eventos e atividades organizados por [Nome da Organização]",)
-    text_y -= 0.3*inch
-    p.drawString(inch, text_y, f"totalizando uma carga horária de")
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(inch + 3.5*inch, text_y, f"{certificate.total_hours_at_generation} horas.")
-
-    p.setFont("Helvetica", 10)
-    p.drawString(inch, 2*inch, f"Emitido em: {certificate.issue_date.strftime("%d/%m/%Y")}")
-    p.drawString(inch, 1.8*inch, f"Código de Validação: {certificate.unique_code}")
+    template = CERTIFICATE_TEMPLATE
+    p = canvas.Canvas(buffer, pagesize=template.pagesize)
 
     # Add QR Code for validation
     # IMPORTANT: Replace 'YOUR_FRONTEND_VALIDATION_URL_BASE' with the actual frontend URL
     # In a real app, this URL should come from settings or environment variables
     validation_url_base = os.environ.get("FRONTEND_VALIDATION_URL", "http://localhost:3000/validate-certificate") 
     validation_url = f"{validation_url_base}?code={certificate.unique_code}"
-    qr_img = generate_qr_code_img(validation_url)
-    
-    # Save QR code to a temporary buffer to draw it
-    qr_buffer = io.BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
-    
-    # Draw QR code from buffer
-    # Need Pillow installed for drawImage to read from buffer directly
-    # If using older ReportLab or missing Pillow features, save to temp file first
-    from reportlab.lib.utils import ImageReader
-    qr_reader = ImageReader(qr_buffer)
-    p.drawImage(qr_reader, width - 2*inch, 1.5*inch, width=1*inch, height=1*inch, mask="auto")
-    qr_buffer.close()
-
-    p.showPage() # End Page 1
-
-    # --- Page 2: Detailed List --- 
-    p.setFont("Helvetica-Bold", 16)
-    p.drawCentredString(width / 2.0, height - 1.5*inch, "DETALHAMENTO DE PARTICIPAÇÃO")
-
-    # Table Header
-    header_y = height - 2.5*inch
-    p.setFont("Helvetica-Bold", 11)
-    p.drawString(inch, header_y, "Evento")
-    p.drawString(width - 2*inch, header_y, "Horas")
-    p.line(inch, header_y - 0.1*inch, width - inch, header_y - 0.1*inch)
-
-    # Table Content
-    p.setFont("Helvetica", 10)
-    y_position = header_y - 0.4*inch
-    line_height = 0.3*inch
-    
-    # Fetch attendance details again here, ensuring consistency with total_hours_at_generation
-    # Ideally, the certificate generation logic should pass these details to avoid redundant queries.
-    attendances = Attendance.objects.filter(
-        participant=certificate.participant,
-        check_in_time__isnull=False,
-        check_out_time__isnull=False,
-        # Add filter if certificate is tied to specific events or date range
-        # check_in_time__date__lte=certificate.issue_date 
-    ).select_related("event").values(
-        "event__name"
-    ).annotate(
-        hours=Sum("calculated_hours")
-    ).order_by("event__name")
-
-    for item in attendances:
-        if y_position < 1.5*inch: # Check if space is left, create new page if needed
-            p.showPage()
-            p.setFont("Helvetica-Bold", 16) # Redraw header on new page if needed
-            p.drawCentredString(width / 2.0, height - 1.5*inch, "DETALHAMENTO DE PARTICIPAÇÃO (cont.)")
-            header_y = height - 2.5*inch
-            p.setFont("Helvetica-Bold", 11)
-            p.drawString(inch, header_y, "Evento")
-            p.drawString(width - 2*inch, header_y, "Horas")
-            p.line(inch, header_y - 0.1*inch, width - inch, header_y - 0.1*inch)
-            p.setFont("Helvetica", 10)
-            y_position = header_y - 0.4*inch # Reset Y for new page
-        
-        # Use Paragraph for potential text wrapping if event names are long
-        event_name_paragraph = Paragraph(item["event__name"], style_normal)
-        event_name_paragraph.wrapOn(p, width - 3.5*inch, line_height) # Adjust width as needed
-        event_name_paragraph.drawOn(p, inch, y_position - event_name_paragraph.height + 0.1*inch) # Adjust vertical position
-
-        p.drawString(width - 2*inch, y_position, f"{item["hours"]:.2f}")
-        y_position -= max(line_height, event_name_paragraph.height + 0.1*inch) # Move down by paragraph height or min line height
+
+    template.render(
+        p,
+        participant_name=certificate.participant.get_full_name() or certificate.participant.username,
+        total_hours=certificate.total_hours_at_generation,
+        issue_date=certificate.issue_date,
+        unique_code=certificate.unique_code,
+        draw_qr=lambda p, x, y, size: draw_qr_code(p, validation_url, x, y, size),
+        event_rows=((item["event_name"], item["hours"]) for item in certificate.attended_events()),
+    )
 
     p.save()
     # PDF generation is complete, buffer contains the data
 
+def certificate_pdf_name(certificate):
+    """Storage name of the certificate PDF for the current template version."""
+    return f"certificates/cert_{certificate.unique_code}_v{CERTIFICATE_TEMPLATE_VERSION}.pdf"
+
+def get_certificate_pdf(certificate):
+    """
+    Returns the stored PDF file of the certificate, rendering and persisting it
+    only when no file exists for the current template version.
+    """
+    expected_name = certificate_pdf_name(certificate)
+    pdf_file = certificate.pdf_file
+    if pdf_file and pdf_file.name == expected_name and pdf_file.storage.exists(expected_name):
+        return pdf_file
+
+    if pdf_file and pdf_file.name != expected_name:
+        # Rendered with an older template version
+        pdf_file.delete(save=False)
+
+    if pdf_file.storage.exists(expected_name):
+        # Another worker already rendered it, just link the file
+        pdf_file.name = expected_name
+    else:
+        buffer = io.BytesIO()
+        generate_certificate_pdf(buffer, certificate)
+        pdf_file.save(os.path.basename(expected_name), ContentFile(buffer.getvalue()), save=False)
+    certificate.save(update_fields=['pdf_file'])
+    return certificate.pdf_file
+
+class _ZipStreamSink:
+    """Write-only, unseekable file object for ZipFile whose content is drained as it is produced."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_certificates_zip(certificates):
+    """
+    Yields a ZIP archive with the PDF of each certificate, fetching or rendering
+    one PDF at a time so memory stays bounded by a single certificate.
+    """
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for certificate in certificates:
+            pdf_file = get_certificate_pdf(certificate)
+            entry_name = f"certificado_{certificate.participant.username}_{certificate.unique_code}.pdf"
+            with pdf_file.open("rb"), archive.open(entry_name, mode="w") as entry:
+                for chunk in pdf_file.chunks():
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    yield sink.drain()
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() hands each formatted line back instead of storing it."""
+    def write(self, value):
+        return value
+
+# Leading characters that make spreadsheet programs read a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def spreadsheet_safe(value):
+    """Text cell with a leading quote when it would start a formula (CSV formula injection)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+ATTENDANCE_REPORT_HEADER = (
+    "participante_id", "usuario", "nome", "email", "sessoes", "horas", "percentual_carga_horaria"
+)
+
+def stream_attendance_report_csv(total_workload, rows):
+    """
+    Yields the per-event attendance report as CSV lines from
+    (participant_id, username, first_name, last_name, email, sessions, hours) tuples.
+    User-provided text is passed through spreadsheet_safe().
+    """
+    writer = csv.writer(_Echo())
+    # BOM so spreadsheet programs read the file as UTF-8
+    yield "\ufeff" + writer.writerow(ATTENDANCE_REPORT_HEADER)
+    for participant_id, username, first_name, last_name, email, sessions, hours in rows:
+        hours = Decimal(hours).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        percentage = (hours * 100 / total_workload).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) if total_workload else ""
+        yield writer.writerow((
+            participant_id, spreadsheet_safe(username), spreadsheet_safe(f"{first_name} {last_name}".strip()),
+            spreadsheet_safe(email), sessions, hours, percentage
+        ))
+
 # --- Example Usage in Views (Simplified) --- 
 # from django.http import HttpResponse
 # from .utils import generate_certificate_pdf
@@ -1,30 +1,55 @@
 # backend/api/views.py
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, status, mixins
+from rest_framework import exceptions as drf_exceptions
 from rest_framework.permissions import IsAuthenticated # Import missing permission
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from django.db.models import Sum
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from asgiref.sync import sync_to_async
+from django.db.models import Sum, Q, Count
 from django.utils import timezone
 from decimal import Decimal
+from datetime import timedelta
 import io
-import os
-from django.http import HttpResponse
+import uuid
+import hashlib
+import threading
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt # Para desabilitar CSRF se for uma API pura e você gerencia tokens de outra forma
 from django.views.decorators.http import require_POST
-from django.db import transaction, IntegrityError
-from django.core.validators import validate_email # Para validação de email
-from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 
-from .models import CustomUser, Event, Attendance, Certificate, Participant
+from .models import (
+    CustomUser, Event, Attendance, Certificate, HoursLedger, ImportJob,
+    EventStats, CheckInHourlyStats, CertificateDailyStats, calculate_hours, MAX_CALCULATED_HOURS
+)
+from .ledger import participant_event_hours, events_breakdown, events_breakdown_key, apply_attendance_changes
+from .rollups import apply_checkin_changes, apply_certificate_changes
+from .cache import certificate_validation_cache, active_events, user_cache
+from .live import publish_attendance_change, event_counts_stream
+from .authentication import RoleJWTAuthentication
+from .renderers import FastJSONRenderer, FastJSONParser
+from .qr_tokens import issue_checkin_token, verify_checkin_token, CheckinTokenError, CLOCK_SKEW
+from .importers import (
+    import_participants, run_participant_import,
+    import_attendances, iter_spreadsheet_rows, iter_chunks
+)
 from .serializers import (
     CustomUserSerializer, EventSerializer, AttendanceSerializer, 
-    CertificateSerializer, CheckinSerializer, CertificateValidationSerializer
+    CertificateSerializer, CheckinSerializer, CertificateValidationSerializer,
+    CertificateBatchSerializer, AttendanceSyncItemSerializer, CheckinTokenSerializer,
+    ImportJobSerializer, requested_fields
 )
 # Import the PDF generation utility
-from .utils import generate_certificate_pdf 
+from .pagination import AttendancePagination, CertificatePagination, UserPagination
+from .utils import get_certificate_pdf, stream_certificates_zip, stream_attendance_report_csv
 
 # Custom Permissions
 class IsAdminUser(permissions.BasePermission):
@@ -39,21 +64,53 @@ class IsParticipantUser(permissions.BasePermission):
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """Allows access only to owner of the object or admin users."""
+    # Compares ids: request.user may be a token-backed user (see api/authentication.py)
     def has_object_permission(self, request, view, obj):
         if request.user.role == 'admin':
             return True
         if isinstance(obj, CustomUser):
-            return obj == request.user
+            return obj.pk == request.user.id
         if isinstance(obj, Attendance):
-            return obj.participant == request.user
+            return obj.participant_id == request.user.id
         if isinstance(obj, Certificate):
-            return obj.participant == request.user
+            return obj.participant_id == request.user.id
         return False
 
+class SparseListMixin:
+    """
+    List fast path for ?fields= selections that values_plan() can serve: rows are read with
+    QuerySet.values() and converted column by column, without building model instances.
+    """
+    def list(self, request, *args, **kwargs):
+        if not requested_fields(request):
+            return super().list(request, *args, **kwargs)
+        plan = self.get_serializer().values_plan()
+        if not plan:
+            return super().list(request, *args, **kwargs)
+
+        # Keyset pagination reads its key from the rows
+        key_fields = [name.lstrip('-') for name in getattr(self.paginator, 'ordering', ())]
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *dict.fromkeys([lookup for _, lookup, _ in plan] + key_fields)
+        )
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        data = [
+            {
+                name: row[lookup] if converter is None or row[lookup] is None else converter(row[lookup])
+                for name, lookup, converter in plan
+            }
+            for row in rows
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
 # ViewSets
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(SparseListMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
+    pagination_class = UserPagination
 
     def get_permissions(self):
         if self.action == 'create':
@@ -68,12 +125,16 @@ class CustomUserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
+        # Read requests authenticate with a token-backed user, so this is built from the token claims
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
 class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all().order_by('-start_date')
     serializer_class = EventSerializer
+    # Bulk exports of participant data: the admin role is checked against the database (see
+    # RoleJWTAuthentication), so a demoted or deactivated admin loses them before the token expires
+    full_user_actions = ('certificates_zip', 'attendance_report')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -82,17 +143,121 @@ class EventViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], url_path='checkin-token', serializer_class=CheckinTokenSerializer)
+    def checkin_token(self, request, pk=None):
+        """Issues a signed check-in QR token for the event; door screens call it again to rotate the QR."""
+        event = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lifetime = serializer.validated_data.get('lifetime', settings.CHECKIN_QR_TOKEN_LIFETIME)
+
+        valid_from = timezone.now()
+        valid_until = min(valid_from + timedelta(seconds=lifetime), event.end_date)
+        if valid_until <= valid_from:
+            return Response({'error': 'Evento já encerrado.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'event_id': event.pk,
+            'token': issue_checkin_token(event.pk, valid_from, valid_until),
+            'valid_from': valid_from,
+            'valid_until': valid_until
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], url_path='certificates-zip')
+    def certificates_zip(self, request, pk=None):
+        """Streams a ZIP with the certificates that include the event."""
+        event = self.get_object()
+        # Narrowed to the event's participants in SQL; the events a certificate covers are in its breakdown snapshot
+        certificates = (
+            certificate
+            for certificate in Certificate.objects.filter(
+                participant_id__in=Attendance.objects.filter(event=event).values('participant_id')
+            ).select_related('participant').iterator(chunk_size=200)
+            if certificate.covers_event(event.pk)
+        )
+
+        response = StreamingHttpResponse(stream_certificates_zip(certificates), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="certificados_evento_{event.pk}.zip"'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='attendance-report')
+    def attendance_report(self, request, pk=None):
+        """Streams a CSV with each participant's closed sessions, hours and share of the event workload."""
+        event = self.get_object()
+        rows = Attendance.objects.filter(
+            event=event,
+            check_in_time__isnull=False,
+            check_out_time__isnull=False
+        ).values(
+            'participant_id'
+        ).annotate(
+            sessions=Count('id'),
+            hours=Sum('calculated_hours')
+        ).values_list(
+            'participant_id', 'participant__username', 'participant__first_name', 'participant__last_name',
+            'participant__email', 'sessions', 'hours'
+        ).order_by('participant__username').iterator(chunk_size=2000)
+
+        response = StreamingHttpResponse(
+            stream_attendance_report_csv(event.total_workload, rows), content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="relatorio_frequencia_evento_{event.pk}.csv"'
+        return response
+
+# Check-in/check-out steps shared by AttendanceViewSet and the async views (async_check_in, async_check_out)
+def check_in_token_error(qr_data, event_id):
+    """The error message for a QR token that is invalid, expired or for another event; None if it is valid."""
+    try:
+        token_event_id = verify_checkin_token(qr_data)
+    except CheckinTokenError as exc:
+        return str(exc)
+    if token_event_id != event_id:
+        return 'QR Code não corresponde a este evento.'
+    return None
+
+def event_is_open(event, now):
+    return event is not None and event.start_date <= now <= event.end_date
+
+def record_check_in(participant_id, event_id, now, latitude=None, longitude=None):
+    """
+    Opens an attendance and updates the rollups and live counters. Returns its id, or None when
+    the event is gone or the participant already has an open attendance for it.
+    """
+    # Single round trip: the insert only happens if the event still exists and the participant has
+    # no open attendance for it (unique_open_attendance), so double taps cannot create duplicates.
+    with transaction.atomic():
+        attendance_id = Attendance.objects.open_check_in(
+            participant_id=participant_id,
+            event_id=event_id,
+            check_in_time=now,
+            method='qrcode',
+            notes=f"Check-in via QR. Geo: ({latitude}, {longitude})" if latitude and longitude else "Check-in via QR."
+        )
+        # The raw insert skips the model signals
+        if attendance_id is not None:
+            apply_checkin_changes(added=[(event_id, now)])
+            publish_attendance_change(event_id, 'check_in', participant_id, now)
+    return attendance_id
+
+def record_check_out(attendance, now):
+    """Closes an open attendance; save() calculates the hours and the signals update the ledger and rollups."""
+    attendance.check_out_time = now
+    attendance.save()
+    publish_attendance_change(attendance.event_id, 'check_out', attendance.participant_id, attendance.check_out_time)
+    return attendance
+
+class AttendanceViewSet(SparseListMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AttendancePagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
             return Attendance.objects.all().select_related('participant', 'event')
         elif user.role == 'participant':
-            return Attendance.objects.filter(participant=user).select_related('participant', 'event')
+            return Attendance.objects.filter(participant_id=user.id).select_related('participant', 'event')
         return Attendance.objects.none()
 
     def perform_create(self, serializer):
@@ -103,7 +268,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Participants can only register attendance via check-in.")
 
     def get_permissions(self):
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in ['update', 'partial_update', 'destroy', 'bulk_import', 'sync']:
             self.permission_classes = [IsAdminUser]
         # Let check_in and check_out define their own permissions via decorator
         elif self.action not in ['check_in', 'check_out']:
@@ -119,71 +284,247 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         latitude = serializer.validated_data.get('latitude')
         longitude = serializer.validated_data.get('longitude')
 
-        # --- QR Code Validation Logic --- 
-        # This is a placeholder. Real validation would involve:
-        # 1. Decoding qr_data: Does it contain a specific token, event ID, timestamp?
-        # 2. Verifying the token/data against the event (e.g., check if a specific QR code was generated for this event).
-        # 3. Checking event time constraints (is the event active?).
-        # 4. Optionally, validating geolocation if provided.
-        # For now, we assume qr_data is valid if it exists and event exists.
-        is_qr_valid = bool(qr_data) # Placeholder validation
-
-        if not is_qr_valid:
-             return Response({'error': 'QR Code inválido ou dados ausentes.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            event = Event.objects.get(pk=event_id)
-            # Add time validation: Check if timezone.now() is within event.start_date and event.end_date?
-            # if not (event.start_date <= timezone.now() <= event.end_date):
-            #     return Response({'error': 'Evento não está ativo no momento.'}, status=status.HTTP_400_BAD_REQUEST)
-        except Event.DoesNotExist:
-            return Response({'error': 'Evento não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Check if already checked-in (and not checked-out) for this event
-        existing_attendance = Attendance.objects.filter(
-            participant=request.user,
-            event=event,
-            check_out_time__isnull=True
-        ).first()
-
-        if existing_attendance:
+        # Signed, time-windowed token verified in-process: bad or stale scans never reach the database
+        error = check_in_token_error(qr_data, event_id)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Existence and time window come from the per-process active events cache
+        now = timezone.now()
+        event = active_events.get(event_id)
+        if not event_is_open(event, now):
+            if event is None and not Event.objects.filter(pk=event_id).exists():
+                return Response({'error': 'Evento não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'error': 'Evento não está ativo no momento.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        attendance_id = record_check_in(request.user.pk, event_id, now, latitude, longitude)
+        if attendance_id is None:
+            if not Event.objects.filter(pk=event_id).exists():
+                return Response({'error': 'Evento não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'status': 'Você já realizou o check-in para este evento e ainda não fez check-out.'}, status=status.HTTP_200_OK)
 
-        # Create new attendance record
-        attendance = Attendance.objects.create(
-            participant=request.user,
-            event=event,
-            check_in_time=timezone.now(),
-            method='qrcode',
-            notes=f"Check-in via QR. Geo: ({latitude}, {longitude})" if latitude and longitude else "Check-in via QR."
-        )
-        return Response({'status': 'Check-in realizado com sucesso.', 'attendance_id': attendance.id}, status=status.HTTP_201_CREATED)
+        return Response({'status': 'Check-in realizado com sucesso.', 'attendance_id': attendance_id}, status=status.HTTP_201_CREATED)
 
     # Check-out might need the specific attendance ID to close
     @action(detail=True, methods=['post'], permission_classes=[IsParticipantUser])
     def check_out(self, request, pk=None):
         try:
             # Participant can only check-out their own attendance
-            attendance = Attendance.objects.get(pk=pk, participant=request.user, check_out_time__isnull=True)
-            attendance.check_out_time = timezone.now()
-            attendance.save() # save() method calculates hours
+            attendance = Attendance.objects.get(pk=pk, participant_id=request.user.id, check_out_time__isnull=True)
+            record_check_out(attendance, timezone.now())
             return Response({'status': 'Check-out realizado com sucesso.', 'calculated_hours': attendance.calculated_hours}, status=status.HTTP_200_OK)
         except Attendance.DoesNotExist:
             return Response({'error': 'Registro de check-in aberto não encontrado para este usuário.'}, status=status.HTTP_404_NOT_FOUND)
 
-class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'], url_path='sync')
+    def sync(self, request):
+        """
+        Applies check-ins/check-outs queued offline by a scanner device, in timestamp order.
+        Body: {"items": [{"client_id", "action", "event_id", "participant_id", "timestamp"}, ...]}.
+        Returns one result per item so the device can clear its queue; replayed items are reported as duplicates.
+        Admins only (scanner devices): items carry no QR token, so only timestamps within the event are accepted.
+        """
+        raw_items = request.data.get('items') if isinstance(request.data, dict) else None
+        if not isinstance(raw_items, list) or not raw_items:
+            return Response({'error': 'Envie uma lista de itens em "items".'}, status=status.HTTP_400_BAD_REQUEST)
+        # A little ahead of our clock is tolerated, like the QR tokens do
+        latest_timestamp = timezone.now() + timedelta(seconds=CLOCK_SKEW)
+
+        results = [None] * len(raw_items)
+        items = []
+        for index, raw_item in enumerate(raw_items):
+            item_serializer = AttendanceSyncItemSerializer(data=raw_item)
+            if not item_serializer.is_valid():
+                results[index] = {
+                    'client_id': raw_item.get('client_id') if isinstance(raw_item, dict) else None,
+                    'status': 'error',
+                    'error': 'Dados inválidos.',
+                    'details': item_serializer.errors
+                }
+                continue
+            item = dict(item_serializer.validated_data, index=index)
+            if item['timestamp'] > latest_timestamp:
+                results[index] = {'client_id': item['client_id'], 'status': 'error', 'error': 'Horário posterior ao momento atual.'}
+                continue
+            items.append(item)
+        items.sort(key=lambda item: item['timestamp'])
+
+        participant_ids = {item['participant_id'] for item in items}
+        event_ids = {item['event_id'] for item in items}
+        timestamps = {item['timestamp'] for item in items}
+        event_windows = {
+            event_id: (start_date, end_date)
+            for event_id, start_date, end_date in Event.objects.filter(pk__in=event_ids).values_list('pk', 'start_date', 'end_date')
+        }
+        known_participants = set(
+            CustomUser.objects.filter(pk__in=participant_ids, role='participant').values_list('pk', flat=True)
+        )
+
+        to_create = []
+        to_update = []
+        pending = [] # (item, attendance, status) waiting for the attendance id
+        with transaction.atomic():
+            attendances = Attendance.objects.filter(participant_id__in=participant_ids, event_id__in=event_ids)
+            open_attendances = {
+                (attendance.participant_id, attendance.event_id): attendance
+                for attendance in attendances.filter(check_out_time__isnull=True).select_for_update()
+            }
+            # Items already applied by an earlier sync of the same queue
+            synced = {}
+            for attendance_id, participant_id, event_id, check_in_time, check_out_time in attendances.filter(
+                Q(check_in_time__in=timestamps) | Q(check_out_time__in=timestamps)
+            ).values_list('pk', 'participant_id', 'event_id', 'check_in_time', 'check_out_time'):
+                synced[('check_in', participant_id, event_id, check_in_time)] = attendance_id
+                synced[('check_out', participant_id, event_id, check_out_time)] = attendance_id
+
+            for item in items:
+                pair = (item['participant_id'], item['event_id'])
+                result = {'client_id': item['client_id']}
+                results[item['index']] = result
+                if item['event_id'] not in event_windows:
+                    result.update(status='error', error='Evento não encontrado.')
+                elif item['participant_id'] not in known_participants:
+                    result.update(status='error', error='Participante não encontrado.')
+                elif not event_windows[item['event_id']][0] <= item['timestamp'] <= event_windows[item['event_id']][1]:
+                    result.update(status='error', error='Horário fora do período do evento.')
+                elif (item['action'], *pair, item['timestamp']) in synced:
+                    result.update(status='duplicate', attendance_id=synced[(item['action'], *pair, item['timestamp'])])
+                elif item['action'] == 'check_in':
+                    if pair in open_attendances:
+                        result.update(status='skipped', error='Check-in já aberto para este evento.')
+                        pending.append((result, open_attendances[pair]))
+                        continue
+                    attendance = Attendance(
+                        participant_id=pair[0],
+                        event_id=pair[1],
+                        check_in_time=item['timestamp'],
+                        method='qrcode',
+                        notes="Check-in via QR (sincronizado do dispositivo)."
+                    )
+                    open_attendances[pair] = attendance
+                    to_create.append(attendance)
+                    result['status'] = 'checked_in'
+                    pending.append((result, attendance))
+                else:
+                    attendance = open_attendances.get(pair)
+                    if attendance is None:
+                        result.update(status='error', error='Registro de check-in aberto não encontrado para este usuário.')
+                    elif attendance.check_in_time is None:
+                        result.update(status='error', error='Registro de check-in sem horário de entrada.')
+                    elif item['timestamp'] < attendance.check_in_time:
+                        result.update(status='error', error='Check-out anterior ao check-in.')
+                    elif calculate_hours(attendance.check_in_time, item['timestamp']) > MAX_CALCULATED_HOURS:
+                        result.update(status='error', error='Duração da sessão excede o limite de horas.')
+                    else:
+                        attendance.check_out_time = item['timestamp']
+                        attendance.calculated_hours = calculate_hours(attendance.check_in_time, attendance.check_out_time)
+                        del open_attendances[pair]
+                        if attendance.pk:
+                            to_update.append(attendance)
+                        result.update(status='checked_out', calculated_hours=attendance.calculated_hours)
+                        pending.append((result, attendance))
+
+            created = [attendance for attendance in to_create if attendance.check_out_time is not None]
+            Attendance.objects.bulk_create(created)
+            # Open check-ins take the conflict-tolerant insert of QR check-in: an open attendance created
+            # after the lock above (a live check-in, another scanner) makes them skipped instead of failing
+            for attendance in to_create:
+                if attendance.check_out_time is None:
+                    attendance.pk = Attendance.objects.open_check_in(
+                        participant_id=attendance.participant_id,
+                        event_id=attendance.event_id,
+                        check_in_time=attendance.check_in_time,
+                        method=attendance.method,
+                        notes=attendance.notes
+                    )
+                    if attendance.pk is not None:
+                        created.append(attendance)
+            for position, (result, attendance) in enumerate(pending):
+                if result['status'] == 'checked_in' and attendance.pk is None:
+                    existing = Attendance.objects.filter(
+                        participant_id=attendance.participant_id, event_id=attendance.event_id, check_out_time__isnull=True
+                    ).first()
+                    if existing is None:
+                        result.update(status='error', error='Evento não encontrado.')
+                    else:
+                        result.update(status='skipped', error='Check-in já aberto para este evento.')
+                    pending[position] = (result, existing)
+            Attendance.objects.bulk_update(to_update, ['check_out_time', 'calculated_hours'])
+            # Bulk writes skip the model signals; only closed sessions count in the ledger
+            apply_attendance_changes(added=[attendance.ledger_state() for attendance in created + to_update])
+            apply_checkin_changes(added=[attendance.checkin_state() for attendance in created])
+            for result, attendance in pending:
+                if result['status'] == 'checked_in':
+                    publish_attendance_change(attendance.event_id, 'check_in', attendance.participant_id, attendance.check_in_time)
+                elif result['status'] == 'checked_out':
+                    publish_attendance_change(attendance.event_id, 'check_out', attendance.participant_id, attendance.check_out_time)
+
+        for result, attendance in pending:
+            if attendance is not None:
+                result['attendance_id'] = attendance.pk
+
+        return Response({
+            'created_count': len(created),
+            'closed_count': sum(1 for result in results if result['status'] == 'checked_out'),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Imports closed attendances (e.g. paper sign-in sheets) as method='import'.
+        Accepts a JSON list of {"email" or "cpf", "event_id", "check_in_time", "check_out_time", "notes"}
+        or a .csv/.xlsx upload in "file" with the same columns. All rows are imported in one transaction.
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = iter_spreadsheet_rows(upload, upload.name)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response({'error': 'Envie uma lista de presenças ou um arquivo .csv/.xlsx em "file".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        success_entries, failed_entries = [], []
+        try:
+            with transaction.atomic():
+                for chunk in iter_chunks(rows):
+                    chunk_success, chunk_failed = import_attendances(chunk)
+                    success_entries.extend(chunk_success)
+                    failed_entries.extend(chunk_failed)
+        except ValueError as e: # Arquivo ilegível
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'imported_count': len(success_entries),
+            'failed_count': len(failed_entries),
+            'failed_entries': failed_entries,
+            'success_entries': success_entries
+        }, status=status.HTTP_200_OK)
+
+class CertificateViewSet(SparseListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Certificate.objects.all()
     serializer_class = CertificateSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CertificatePagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
             return Certificate.objects.all().select_related('participant')
         elif user.role == 'participant':
-            return Certificate.objects.filter(participant=user).select_related('participant')
+            return Certificate.objects.filter(participant_id=user.id).select_related('participant')
         return Certificate.objects.none()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            # ?include_details=false omits the per-event breakdown from list responses
+            context['include_events_details'] = self.request.query_params.get('include_details', 'true').lower() not in ('false', '0', 'no')
+        return context
+
     @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
     def generate_certificate(self, request):
         participant_id = request.data.get('participant_id')
@@ -195,11 +536,8 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
         except CustomUser.DoesNotExist:
             return Response({'error': 'Participante não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
 
-        total_hours = Attendance.objects.filter(
-            participant=participant,
-            check_in_time__isnull=False,
-            check_out_time__isnull=False
-        ).aggregate(total=Sum('calculated_hours'))['total'] or Decimal('0.00')
+        event_hours = list(participant_event_hours(participant.pk))
+        total_hours = sum((row['hours'] for row in event_hours), Decimal('0.00'))
 
         if total_hours <= 0:
              return Response({'error': 'Participante não possui horas computadas para gerar certificado.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -212,11 +550,99 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
 
         certificate = Certificate.objects.create(
             participant=participant,
-            total_hours_at_generation=total_hours
+            total_hours_at_generation=total_hours,
+            events_breakdown=events_breakdown(event_hours)
         )
         serializer = self.get_serializer(certificate)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='generate-batch', permission_classes=[IsAdminUser], serializer_class=CertificateBatchSerializer)
+    def generate_certificates_batch(self, request):
+        """Issues certificates for every participant with hours in the given events and/or date range."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        event_ids = list(data.get('event_ids', []))
+        if data.get('event_id'):
+            event_ids.append(data['event_id'])
+
+        if data.get('start_date') or data.get('end_date'):
+            # Date ranges need the individual sessions, the ledger only has per-event totals
+            rows = Attendance.objects.filter(check_in_time__isnull=False, check_out_time__isnull=False)
+            if data.get('start_date'):
+                rows = rows.filter(check_in_time__date__gte=data['start_date'])
+            if data.get('end_date'):
+                rows = rows.filter(check_in_time__date__lte=data['end_date'])
+            hours_field = 'calculated_hours'
+        else:
+            # Entries whose attendances were all deleted stay behind with 0 sessions
+            rows = HoursLedger.objects.filter(sessions__gt=0)
+            hours_field = 'hours'
+        rows = rows.filter(participant__role='participant')
+        if event_ids:
+            rows = rows.filter(event_id__in=event_ids)
+
+        # One grouped query for every eligible participant and event
+        event_hours = {}
+        usernames = {}
+        for row in rows.values('participant_id', 'participant__username', 'event_id', 'event__name').annotate(
+            hours=Sum(hours_field)
+        ).order_by('participant__username', 'participant_id', 'event__name'):
+            usernames[row['participant_id']] = row['participant__username']
+            event_hours.setdefault(row['participant_id'], []).append(row)
+        totals = [
+            {
+                'participant_id': participant_id,
+                'participant__username': usernames[participant_id],
+                'total': sum((row['hours'] for row in participant_rows), Decimal('0.00')),
+                'event_hours': participant_rows,
+            }
+            for participant_id, participant_rows in event_hours.items()
+        ]
+        # Same participant with the same events and hours per event means the certificate was already issued
+        existing = {
+            (participant_id, events_breakdown_key(breakdown))
+            for participant_id, breakdown in Certificate.objects.filter(
+                participant_id__in=[row['participant_id'] for row in totals]
+            ).values_list('participant_id', 'events_breakdown')
+        }
+
+        results = []
+        to_create = []
+        for row in totals:
+            result = {
+                'participant_id': row['participant_id'],
+                'participant_username': row['participant__username'],
+                'total_hours': row['total'],
+            }
+            breakdown = events_breakdown(row['event_hours'])
+            if not row['total'] or row['total'] <= 0:
+                result.update(status='skipped', reason='Participante não possui horas computadas.')
+            elif (row['participant_id'], events_breakdown_key(breakdown)) in existing:
+                result.update(status='skipped', reason='Certificado já emitido para estes eventos e horas.')
+            else:
+                result['status'] = 'created'
+                to_create.append((result, Certificate(
+                    participant_id=row['participant_id'],
+                    total_hours_at_generation=row['total'],
+                    events_breakdown=breakdown
+                )))
+            results.append(result)
+
+        with transaction.atomic():
+            Certificate.objects.bulk_create([certificate for _, certificate in to_create])
+            apply_certificate_changes(added=[certificate.issue_date for _, certificate in to_create])
+        for result, certificate in to_create:
+            result['certificate_id'] = certificate.id
+            result['unique_code'] = certificate.unique_code
+
+        return Response({
+            'created_count': len(to_create),
+            'skipped_count': len(results) - len(to_create),
+            'results': results
+        }, status=status.HTTP_201_CREATED if to_create else status.HTTP_200_OK)
+
     # Use the utility function for PDF generation
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsOwnerOrAdmin])
     def download_pdf(self, request, pk=None):
@@ -226,19 +652,10 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
         except Certificate.DoesNotExist: # Should be handled by DRF default 404
              return Response({'error': 'Certificado não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
 
-        buffer = io.BytesIO()
-        generate_certificate_pdf(buffer, certificate)
-        buffer.seek(0)
-
-        response = HttpResponse(buffer, content_type='application/pdf')
+        # Rendered once per template version and served from storage afterwards
+        pdf_file = get_certificate_pdf(certificate)
+        response = FileResponse(pdf_file.open('rb'), content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="certificado_{certificate.participant.username}_{certificate.unique_code}.pdf"'
-        
-        # Optionally save the generated PDF to the Certificate model's FileField
-        # from django.core.files.base import ContentFile
-        # if not certificate.pdf_file: # Save only if not already saved
-        #     certificate.pdf_file.save(f'cert_{certificate.unique_code}.pdf', ContentFile(buffer.getvalue()), save=True)
-        #     buffer.seek(0) # Reset buffer pointer after reading for save
-
         return response
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny], serializer_class=CertificateValidationSerializer)
@@ -248,19 +665,132 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
         unique_code = serializer.validated_data['unique_code']
 
         try:
+            # Single indexed lookup: the event breakdown is stored on the certificate
             certificate = Certificate.objects.select_related('participant').get(unique_code=unique_code)
-            validation_data = {
-                'is_valid': True,
-                'participant_name': certificate.participant.get_full_name() or certificate.participant.username,
-                'total_hours': certificate.total_hours_at_generation,
-                'issue_date': certificate.issue_date,
-                # Fetch details dynamically for validation response
-                'attended_events': CertificateSerializer(certificate, context=self.get_serializer_context()).data['attended_events_details']
-            }
-            return Response(validation_data, status=status.HTTP_200_OK)
+            return Response(certificate_validation_payload(certificate), status=status.HTTP_200_OK)
         except Certificate.DoesNotExist:
             return Response({'is_valid': False, 'error': 'Certificado inválido ou não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['get'], url_path=r'validate/(?P<unique_code>[0-9a-fA-F-]{36})', permission_classes=[permissions.AllowAny])
+    def validate_certificate_cached(self, request, unique_code=None):
+        """Cacheable validation: strong ETag, long Cache-Control and an in-process LRU in front of the ORM."""
+        try:
+            unique_code = uuid.UUID(unique_code)
+        except ValueError:
+            return Response({'is_valid': False, 'error': 'Certificado inválido ou não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+        cached = certificate_validation_cache.get(unique_code)
+        if cached is None:
+            try:
+                certificate = Certificate.objects.select_related('participant').get(unique_code=unique_code)
+            except Certificate.DoesNotExist:
+                return Response({'is_valid': False, 'error': 'Certificado inválido ou não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+            payload = certificate_validation_payload(certificate)
+            etag = '"%s"' % hashlib.sha256(
+                json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True).encode()
+            ).hexdigest()
+            cached = (payload, etag)
+            certificate_validation_cache.set(unique_code, cached)
+
+        payload, etag = cached
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={settings.CERTIFICATE_VALIDATION_MAX_AGE}',
+        }
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(payload, status=status.HTTP_200_OK, headers=headers)
+
+class ImportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Participant CSV/XLSX uploads. POST stores the file and returns 202 right away;
+    the rows are imported in a background thread and GET /<id>/ reports the progress.
+    A job whose thread died with its worker is reported as failed once IMPORT_JOB_STALE_AFTER
+    passes without progress; the fail_stale_import_jobs command (run on a schedule) records it.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAdminUser]
+    # The error reports repeat the uploaded rows; see EventViewSet.full_user_actions
+    full_user_actions = ('list', 'retrieve')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            job = serializer.save(created_by=request.user)
+            # Start only once the job row is visible to the worker's own connection
+            transaction.on_commit(lambda: threading.Thread(
+                target=run_participant_import, args=(job.pk,), daemon=True
+            ).start())
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class DashboardViewSet(viewsets.ViewSet):
+    """Admin dashboard figures, read only from the rollup tables (see api/rollups.py)."""
+    permission_classes = [IsAdminUser]
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        ?days=N (default 30) limits the certificates per day, ?hours=N (default 24) the check-ins
+        per hour and ?event_id=X restricts the check-ins per hour to one event.
+        """
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+            hours = min(max(int(request.query_params.get('hours', 24)), 1), 24 * 31)
+            event_id = int(request.query_params['event_id']) if request.query_params.get('event_id') else None
+        except ValueError:
+            return Response({'error': 'Parâmetros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.localtime()
+        event_rows = list(EventStats.objects.values(
+            'event_id', 'event__name', 'event__total_workload', 'participants', 'check_ins', 'sessions', 'hours'
+        ).order_by('-event__start_date'))
+        hourly = CheckInHourlyStats.objects.filter(
+            hour__gt=now - timedelta(hours=hours), check_ins__gt=0
+        ).order_by('hour', 'event_id')
+        if event_id is not None:
+            hourly = hourly.filter(event_id=event_id)
+        daily = CertificateDailyStats.objects.filter(
+            day__gt=now.date() - timedelta(days=days), issued__gt=0
+        ).order_by('day')
+
+        return Response({
+            'totals': {
+                'events': len(event_rows),
+                'participations': sum(row['participants'] for row in event_rows),
+                'check_ins': sum(row['check_ins'] for row in event_rows),
+                'sessions': sum(row['sessions'] for row in event_rows),
+                'hours': sum((row['hours'] for row in event_rows), Decimal('0.00')),
+                'certificates': CertificateDailyStats.objects.aggregate(total=Sum('issued'))['total'] or 0,
+            },
+            'events': [
+                {
+                    'event_id': row['event_id'],
+                    'event_name': row['event__name'],
+                    'total_workload': row['event__total_workload'],
+                    'participants': row['participants'],
+                    'check_ins': row['check_ins'],
+                    'sessions': row['sessions'],
+                    'hours': row['hours'],
+                }
+                for row in event_rows
+            ],
+            'check_ins_per_hour': list(hourly.values('event_id', 'hour', 'check_ins')),
+            'certificates_per_day': list(daily.values('day', 'issued')),
+        }, status=status.HTTP_200_OK)
+
+def certificate_validation_payload(certificate):
+    """Public validation data of a certificate."""
+    return {
+        'is_valid': True,
+        'participant_name': certificate.participant.get_full_name() or certificate.participant.username,
+        'total_hours': certificate.total_hours_at_generation,
+        'issue_date': certificate.issue_date,
+        'attended_events': certificate.attended_events()
+    }
+
 @csrf_exempt # Use com cautela. Se sua API usa autenticação baseada em token (ex: JWT), é comum.
              # Se for uma aplicação web tradicional com sessões/cookies, você precisará lidar com CSRF.
 @require_POST # Garante que esta view só aceite requisições POST
@@ -273,82 +803,23 @@ def import_participants_batch_view(request):
     if not isinstance(data, list):
         return JsonResponse({"success": False, "message": "Entrada inválida. Esperava uma lista de participantes."}, status=400)
 
-    imported_count = 0
-    failed_entries = []
-    success_entries = []
-
+    # Validação em memória, consultas IN em blocos e bulk_create em blocos:
+    # o número de consultas não cresce linha a linha com o tamanho do lote.
     # Usar uma transação atômica garante que ou todos os participantes são salvos,
     # ou nenhum é, se ocorrer um erro durante o processo de lote.
     try:
         with transaction.atomic():
-            for item_data in data:
-                try:
-                    cleaned_data = validate_participant_data(item_data)
-                    
-                    # Verificar duplicatas (exemplo: por email)
-                    # A cláusula unique_together ou unique=True no modelo pode lidar com isso no nível do BD,
-                    # mas verificar aqui permite um feedback mais granular.
-                    if Participant.objects.filter(email=cleaned_data['email']).exists():
-                        failed_entries.append({
-                            "data_provided": item_data,
-                            "status": "skipped",
-                            "reason": "Participante já existe (email duplicado)."
-                        })
-                        continue
-
-                    # Criar novo participante
-                    # participant = Participant.objects.create(**cleaned_data)
-                    # Ou, se você quiser instanciar e depois salvar (ex: para sinais)
-                    participant = Participant(
-                        name=cleaned_data['name'],
-                        email=cleaned_data['email'],
-                        cpf=cleaned_data.get('cpf')
-                        # Mapeie outros campos do cleaned_data para o seu modelo Participant
-                    )
-                    participant.save() # Isso pode levantar IntegrityError se houver constraints no BD
-
-                    success_entries.append({
-                        "email": cleaned_data['email'],
-                        "name": cleaned_data['name'],
-                        "id": participant.id, # ID do participante criado
-                        "status": "success"
-                    })
-                    imported_count += 1
-
-                except DjangoValidationError as e:
-                    failed_entries.append({
-                        "data_provided": item_data,
-                        "status": "error",
-                        "reason": "Dados inválidos.",
-                        "details": e.message_dict if hasattr(e, 'message_dict') else e.messages
-                    })
-                except IntegrityError as e: # Erro de integridade do BD (ex: unique constraint)
-                    # transaction.atomic() fará rollback se isso não for capturado e tratado aqui
-                    failed_entries.append({
-                        "data_provided": item_data,
-                        "status": "error",
-                        "reason": f"Erro de integridade no banco de dados: {str(e)}"
-                    })
-                except Exception as e: # Outras exceções inesperadas
-                    failed_entries.append({
-                        "data_provided": item_data,
-                        "status": "error",
-                        "reason": f"Erro inesperado no servidor: {str(e)}"
-                    })
-                    # Se uma exceção não tratada ocorrer aqui, transaction.atomic() fará rollback de tudo.
-
-            # Se chegarmos aqui e transaction.atomic() não foi interrompido por uma exceção não capturada,
-            # as alterações serão commitadas ao sair do bloco 'with'.
-
-    except Exception as e: # Erro durante o processamento do lote que pode ter causado rollback
+            success_entries, failed_entries = import_participants(data)
+    except Exception as e: # Erro durante o processamento do lote que causou rollback
         return JsonResponse({
             "success": False,
             "message": f"Erro crítico durante a importação em lote: {str(e)}. Nenhuma alteração foi salva.",
             "imported_count": 0,
-            "failed_entries": failed_entries, # Pode ter algumas falhas já coletadas
+            "failed_entries": [],
             "success_entries": []
         }, status=500)
 
+    imported_count = len(success_entries)
     message = f"{imported_count} participantes importados com sucesso."
     if failed_entries:
         message += f" {len(failed_entries)} participantes falharam, foram ignorados ou continham erros."
@@ -361,50 +832,118 @@ def import_participants_batch_view(request):
         "success_entries": success_entries
     }, status=200)
 
-def validate_participant_data(data_item):
+async def live_event_stream(request, event_id):
     """
-    Valida os dados de um único participante.
-    Retorna um dicionário de dados limpos ou levanta DjangoValidationError.
+    Server-sent events with the live counts of an event (open check-ins, check-ins and check-outs).
+    Admins only. EventSource cannot send headers, so the access token may come in ?token=.
+    Under WSGI the endless stream would hold a worker thread for good, so it answers 501 there.
     """
-    cleaned_data = {}
-    errors = {}
-
-    # Nome
-    name = data_item.get('name')
-    if not name or not str(name).strip():
-        errors['name'] = 'Nome não pode ser vazio.'
-    else:
-        cleaned_data['name'] = str(name).strip()
-
-    # Email
-    email = data_item.get('email')
-    if not email:
-        errors['email'] = 'Email não pode ser vazio.'
-    else:
-        try:
-            validate_email(email)
-            cleaned_data['email'] = email
-        except DjangoValidationError:
-            errors['email'] = 'Formato de email inválido.'
-    
-    # CPF (opcional)
-    cpf = data_item.get('cpf')
-    if cpf:
-        cleaned_cpf = ''.join(filter(str.isdigit, str(cpf)))
-        # Adicione validação mais robusta de CPF se necessário
-        # if len(cleaned_cpf) != 11:
-        #     errors['cpf'] = 'CPF deve ter 11 dígitos.'
-        cleaned_data['cpf'] = cleaned_cpf
-    else:
-        cleaned_data['cpf'] = None
-        
-    # Adicione validação para outros campos aqui (ex: phone, organization)
-    # cleaned_data['phone'] = data_item.get('phone')
-    # cleaned_data['organization'] = data_item.get('organization')
-
-
-    if errors:
-        raise DjangoValidationError(errors)
-    
-    return cleaned_data
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Transmissão ao vivo disponível apenas com o servidor ASGI.'}, status=501)
 
+    raw_token = request.GET.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    authentication = RoleJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token.encode())
+    except InvalidToken:
+        return JsonResponse({'error': 'Token inválido ou ausente.'}, status=401)
+    role = validated_token.get('role')
+    if role is None: # Token issued before role claims
+        user = await user_cache.aget(validated_token.get(jwt_settings.USER_ID_CLAIM))
+        role = user.role if user is not None and user.is_active else None
+    if role != 'admin':
+        return JsonResponse({'error': 'Acesso restrito a administradores.'}, status=403)
+
+    if not await Event.objects.filter(pk=event_id).aexists():
+        return JsonResponse({'error': 'Evento não encontrado.'}, status=404)
+
+    async def load_counts():
+        # From the dashboard rollups (api/rollups.py): open check-ins are check-ins not yet closed
+        row = await EventStats.objects.filter(event_id=event_id).values('check_ins', 'sessions').afirst()
+        check_ins, check_outs = (row['check_ins'], row['sessions']) if row else (0, 0)
+        return {'event_id': event_id, 'open': check_ins - check_outs, 'check_ins': check_ins, 'check_outs': check_outs}
+
+    response = StreamingHttpResponse(event_counts_stream(event_id, load_counts), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Tell nginx not to buffer the stream
+    return response
+
+
+# Async check-in/check-out for ASGI deployments: same rules and responses as AttendanceViewSet.check_in/check_out,
+# but a request waiting on the database does not hold a worker thread. Reads use the async ORM; the writes
+# (one transaction, then the rollups and live counters on commit) run in a single sync_to_async hop, since
+# Django has no async transactions.
+def _api_response(data, status_code):
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+def _api_error_response(exc):
+    """Like DRF's exception handler for authentication, permission and parse errors."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = _api_response(data, exc.status_code)
+    if isinstance(exc, (drf_exceptions.NotAuthenticated, drf_exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = RoleJWTAuthentication().authenticate_header(request=None)
+    elif isinstance(exc, drf_exceptions.MethodNotAllowed):
+        response['Allow'] = 'POST' # Both async views only take POST
+    return response
+
+async def _async_participant_request(request):
+    """Authenticates a participant and parses the body in DRF's order. Returns (user, data); raises APIException."""
+    result = await RoleJWTAuthentication().aauthenticate(request)
+    if result is None:
+        raise drf_exceptions.NotAuthenticated()
+    user = result[0]
+    if user.role != 'participant': # IsParticipantUser
+        raise drf_exceptions.PermissionDenied()
+    if request.method != 'POST':
+        raise drf_exceptions.MethodNotAllowed(request.method)
+    if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return user, request.POST
+    if request.content_type != 'application/json':
+        raise drf_exceptions.UnsupportedMediaType(request.content_type)
+    data = FastJSONParser().parse(io.BytesIO(request.body), parser_context={'encoding': request.encoding or settings.DEFAULT_CHARSET})
+    return user, data
+
+@csrf_exempt
+async def async_check_in(request):
+    try:
+        user, data = await _async_participant_request(request)
+    except drf_exceptions.APIException as exc:
+        return _api_error_response(exc)
+    serializer = CheckinSerializer(data=data)
+    if not serializer.is_valid():
+        return _api_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    event_id = serializer.validated_data['event_id']
+
+    error = check_in_token_error(serializer.validated_data['qr_code_data'], event_id)
+    if error:
+        return _api_response({'error': error}, status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    event = await active_events.aget(event_id)
+    if not event_is_open(event, now):
+        if event is None and not await Event.objects.filter(pk=event_id).aexists():
+            return _api_response({'error': 'Evento não encontrado.'}, status.HTTP_404_NOT_FOUND)
+        return _api_response({'error': 'Evento não está ativo no momento.'}, status.HTTP_400_BAD_REQUEST)
+
+    attendance_id = await sync_to_async(record_check_in)(
+        user.pk, event_id, now, serializer.validated_data.get('latitude'), serializer.validated_data.get('longitude')
+    )
+    if attendance_id is None:
+        if not await Event.objects.filter(pk=event_id).aexists():
+            return _api_response({'error': 'Evento não encontrado.'}, status.HTTP_404_NOT_FOUND)
+        return _api_response({'status': 'Você já realizou o check-in para este evento e ainda não fez check-out.'}, status.HTTP_200_OK)
+
+    return _api_response({'status': 'Check-in realizado com sucesso.', 'attendance_id': attendance_id}, status.HTTP_201_CREATED)
+
+@csrf_exempt
+async def async_check_out(request, pk):
+    try:
+        user, _ = await _async_participant_request(request)
+    except drf_exceptions.APIException as exc:
+        return _api_error_response(exc)
+    try:
+        attendance = await Attendance.objects.aget(pk=pk, participant_id=user.id, check_out_time__isnull=True)
+    except Attendance.DoesNotExist:
+        return _api_response({'error': 'Registro de check-in aberto não encontrado para este usuário.'}, status.HTTP_404_NOT_FOUND)
+    await sync_to_async(record_check_out)(attendance, timezone.now())
+    return _api_response({'status': 'Check-out realizado com sucesso.', 'calculated_hours': attendance.calculated_hours}, status.HTTP_200_OK)
@@ -147,6 +147,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded participant files waiting to be imported (see api.models.ImportJob). They hold
+# personal data, so they are kept outside MEDIA_ROOT and deleted once the import ends.
+IMPORT_UPLOAD_ROOT = os.environ.get('IMPORT_UPLOAD_ROOT', str(BASE_DIR / 'private' / 'imports'))
+# Seconds without progress after which a pending/running import is considered abandoned
+# (its worker was restarted) and marked as failed
+IMPORT_JOB_STALE_AFTER = int(os.environ.get('IMPORT_JOB_STALE_AFTER', 60 * 60))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -158,13 +165,24 @@ AUTH_USER_MODEL = 'api.CustomUser'
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication that serves read-only requests from the token's role claims
+        'api.authentication.RoleJWTAuthentication',
         # SessionAuthentication might be useful for browsable API
         # 'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly', # Default: ReadOnly for anon, Auth for write
     ),
+    # orjson-backed when installed, same output as DRF's JSON renderer/parser otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
@@ -188,6 +206,10 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
+    # Tokens carry the role and profile claims (see api/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.RoleTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'api.authentication.RoleTokenUser',
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
@@ -199,6 +221,33 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Public certificate validation (GET /api/certificates/validate/<uuid>/)
+# Issued certificates never change, so responses can be cached by browsers and proxies.
+CERTIFICATE_VALIDATION_MAX_AGE = int(os.environ.get('CERTIFICATE_VALIDATION_MAX_AGE', 60 * 60 * 24))
+# Validation payloads kept in each worker's in-process LRU
+CERTIFICATE_VALIDATION_CACHE_SIZE = int(os.environ.get('CERTIFICATE_VALIDATION_CACHE_SIZE', 4096))
+
+# Signed check-in QR tokens. The first key signs, every key verifies: to rotate,
+# prepend a new key and drop the old one once the tokens it signed have expired.
+CHECKIN_QR_KEYS = [key for key in os.environ.get('CHECKIN_QR_KEYS', '').split(',') if key] or [SECRET_KEY]
+# Default lifetime of an issued token in seconds (door screens re-issue the QR periodically)
+CHECKIN_QR_TOKEN_LIFETIME = int(os.environ.get('CHECKIN_QR_TOKEN_LIFETIME', 300))
+
+# Seconds an in-process snapshot of the active events is reused by check-in
+ACTIVE_EVENT_CACHE_TTL = int(os.environ.get('ACTIVE_EVENT_CACHE_TTL', 30))
+
+# Seconds a worker reuses the user row loaded to authenticate writes (deactivations
+# made in other workers take effect within this window)
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 30))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 4096))
+
+# Live attendance counters (GET /api/events/<id>/live/). The in-process broker only reaches
+# clients of the same worker; use 'api.live.PostgresNotifyBroker' with several workers.
+LIVE_BROKER_BACKEND = os.environ.get('LIVE_BROKER_BACKEND', 'api.live.InProcessBroker')
+LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', 100))
+LIVE_KEEPALIVE = int(os.environ.get('LIVE_KEEPALIVE', 15)) # Seconds between keepalive comments
+LIVE_RESYNC_INTERVAL = int(os.environ.get('LIVE_RESYNC_INTERVAL', 60)) # Seconds between counts reloads
+
 # CORS Settings (Allow frontend access)
 # For development, allow all origins. Restrict in production.
 CORS_ALLOW_ALL_ORIGINS = DEBUG